@@ -0,0 +1,62 @@
+"""Measure the per-request cost of resolving and dispatching to an
+endpoint, comparing the uncached path against the cached dispatch of
+:class:`~ramverk.routing.URLMapMixin`.
+
+    $ python -m benchmarks.dispatch
+"""
+
+from inspect             import isclass, ismethod, getargspec
+from timeit              import Timer
+from werkzeug.utils      import import_string
+from ramverk.application import BaseApplication
+from ramverk.routing     import URLMapMixin
+from ramverk.utils       import Bunch
+
+
+ENDPOINT = __name__ + ':word'
+
+
+def word(render, db, translations, segments, request, redirect):
+    return segments
+
+
+class Application(URLMapMixin, BaseApplication):
+    pass
+
+
+application = Application()
+
+environment = Bunch(render=None, db=None, translations=None,
+                    segments=Bunch(word='valsi'), request=None,
+                    redirect=None)
+
+
+def uncached():
+    endpoint = import_string(ENDPOINT)
+    if isclass(endpoint):
+        return endpoint(environment)()
+    args = getargspec(endpoint).args
+    if ismethod(endpoint):
+        del args[0]
+    kwargs = {}
+    for name in args:
+        kwargs[name] = getattr(environment, name)
+    return endpoint(**kwargs)
+
+
+def cached():
+    endpoint = application.resolve_endpoint(ENDPOINT)
+    return application.dispatch_to_endpoint(environment, endpoint)
+
+
+def measure(function, number=100000, repeat=3):
+    best = min(Timer(function).repeat(repeat, number))
+    return best / number * 1e6
+
+
+if __name__ == '__main__':
+    before = measure(uncached)
+    after = measure(cached)
+    print 'uncached: {0:6.2f} us/request'.format(before)
+    print 'cached:   {0:6.2f} us/request'.format(after)
+    print 'speedup:  {0:6.2f}x'.format(before / after)
@@ -0,0 +1,62 @@
+"""Measure the per-request cost of binding the log handler for the thread
+of each request against binding it once for the application, and the
+time a request thread spends logging to a slow stream directly compared
+to through a :class:`~ramverk.logbook.BatchingHandler`.
+
+    $ python -m benchmarks.log_handler
+"""
+
+from time            import sleep
+from timeit          import Timer
+from logbook         import Logger, NestedSetup, NullHandler, StreamHandler
+from ramverk.logbook import BatchingHandler
+
+
+class SlowStream(object):
+
+    def write(self, data):
+        pass
+
+    def flush(self):
+        sleep(0.0001)
+
+
+log = Logger('benchmark')
+
+setup = NestedSetup([NullHandler(), StreamHandler(SlowStream())])
+
+
+def per_request():
+    setup.push_thread()
+    setup.pop_thread()
+
+
+def bound():
+    pass
+
+
+def log_record():
+    log.warn('logged')
+
+
+def measure(function, number=10000, repeat=3):
+    best = min(Timer(function).repeat(repeat, number))
+    return best / number * 1e6
+
+
+if __name__ == '__main__':
+    before = measure(per_request)
+    after = measure(bound)
+    print 'per-request binding:  {0:6.2f} us/request'.format(before)
+    print 'application binding:  {0:6.2f} us/request'.format(after)
+
+    direct = StreamHandler(SlowStream())
+    with direct.applicationbound():
+        before = measure(log_record, number=1000)
+    batching = BatchingHandler(StreamHandler(SlowStream()), block=True)
+    with batching.applicationbound():
+        after = measure(log_record, number=1000)
+    batching.close()
+    print 'direct to slow sink:  {0:6.2f} us/record'.format(before)
+    print 'batched:              {0:6.2f} us/record'.format(after)
+    print 'speedup:              {0:6.2f}x'.format(before / after)
@@ -7,3 +7,4 @@ dsn = "dbname='{database}' user='{username}' host='{host}' port='{port}'"\
       "password='{password}'".format(**config['postgres'])
 storage = lambda: RelStorage(PostgreSQLAdapter(dsn))
 app = Relvlast(storage=storage)
+app.bind_log_handler()
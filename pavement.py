@@ -1,7 +1,7 @@
 from inspect        import isclass
 from werkzeug.utils import import_string
 from paver.easy     import options, Bunch, sh, pushd, path, info
-from paver.easy     import task, consume_args
+from paver.easy     import task, needs, cmdopts, consume_args
 from paver.tasks    import help
 from paver.doctools import doc_clean, html
 from ramverk.paver  import *
@@ -22,26 +22,93 @@ def cover():
 
 
 @task
+@cmdopts([('batch-size=', 'b', 'words per commit (500)'),
+          ('start-after=', 's', 'resume after this word'),
+          ('locale=', 'l', 'only import this locale'),
+          ('processes=', 'p', 'parse exports in this many processes')])
 def import_words():
     """Import data exported to XML from jbovlaste."""
-    from relvlast.importing import words_from_xml
+    from werkzeug.test      import create_environ
+    from relvlast.importing import import_order, read_locales, read_words,\
+                                   save_words
 
-    app = import_string(options.ramverk.app)
+    opts = options.import_words
+    app = import_string(options.app)
     if isclass(app):
         app = app()
 
-    with app:
-        for source in path('exports').files('*.xml'):
-            locale = source.stripext().basename()
+    sources = dict((source.stripext().basename(), source)
+                   for source in path('exports').files('*.xml'))
+    if 'locale' in opts:
+        sources = {opts.locale: sources[opts.locale]}
+
+    if 'processes' in opts:
+        locales = read_locales(sources, int(opts.processes))
+    else:
+        locales = ((locale, read_words(sources[locale]))
+                   for locale in import_order(sources))
+
+    def report(counts, seconds, last):
+        read = sum(counts.itervalues())
+        info('{0} words in {1:.1f}s ({2:.0f}/s), last {3}: '
+             '{added} added, {changed} changed, {unchanged} unchanged'
+             .format(read, seconds, read / seconds, last, **counts))
+
+    with app.contextbound(create_environ()) as env:
+        for locale, words in locales:
             info('importing ' + locale)
-            words_from_xml(source, app.db, locale)
+            save_words(words, env.db, locale, env.transaction_manager,
+                       batch_size=int(opts.get('batch_size', 500)),
+                       start_after=opts.get('start_after'),
+                       report=report)
 
 
 @task
+def migrate_versions():
+    """Upgrade word and page histories and index word properties."""
+    from werkzeug.test    import create_environ
+    from relvlast.objects import word_catalog
+
+    app = import_string(options.app)
+    if isclass(app):
+        app = app()
+
+    with app.contextbound(create_environ()) as env:
+        db = env.db
+        collections = [('words', db.properties.words),
+                       ('pages', db.properties.pages)]
+        collections.extend((locale + ' words', language.words)
+                           for locale, language in db.translations.items())
+        for label, objects in collections:
+            info('migrated {0} {1}'.format(objects.migrate(), label))
+            env.transaction_manager.commit()
+        if db.properties.words.catalog is None:
+            info('indexing words')
+            db.properties.words.reindex(word_catalog())
+            env.transaction_manager.commit()
+
+
+@task
+def index_translations():
+    """Rebuild the full-text indexes of the translations."""
+    from werkzeug.test    import create_environ
+    from relvlast.objects import translation_catalog
+
+    app = import_string(options.app)
+    if isclass(app):
+        app = app()
+
+    with app.contextbound(create_environ()) as env:
+        for locale, language in env.db.translations.items():
+            info('indexing ' + locale)
+            language.words.reindex(translation_catalog(locale))
+            env.transaction_manager.commit()
+
+
+@task
+@needs('build_compiled')
 def deploy():
     """Deploy to ep.io."""
-    with pushd('relvlast/compiled'):
-        sh('pyscss -o main.css main.scss')
     sh('epio upload')
 
 
@@ -1,15 +1,49 @@
+try:
+    import simplejson as json
+except ImportError: #pragma: no cover
+    import json
+
+from errno          import ENOENT
+from hashlib        import sha1
+from os             import listdir, makedirs, path, remove
+from re             import compile as regex
+from pkg_resources  import resource_filename
+from werkzeug.http  import is_resource_modified, unquote_etag
 from werkzeug.utils import cached_property
+from ramverk.utils  import write_atomically
+
+
+_hashed_name = regex(r'^[^.]+\.[0-9a-f]{12}\.')
 
 
 class EnvironmentCompilerMixin(object):
-    """Environment mixin dispatching to compilers."""
+    """Environment mixin dispatching to compilers. Responses with an
+    :mailheader:`ETag` are answered with :http:statuscode:`304` if the
+    request has a matching :mailheader:`If-None-Match`. URLs for the
+    ``'compiled'`` endpoint are built for the content-hashed static file
+    instead if it is listed in the
+    :attr:`~CompilerMixinBase.compiled_manifest`."""
+
+    def build_url(self, endpoint=None, values=None, *args, **kwargs):
+        if endpoint == 'compiled':
+            manifest = self.application.compiled_manifest
+            if values.get('name') in manifest:
+                endpoint = 'static'
+                values = dict(values, name=manifest[values['name']])
+        return super(EnvironmentCompilerMixin, self)\
+              .build_url(endpoint, values, *args, **kwargs)
 
     def __call__(self):
         if self.request.path.startswith('/compiled/'):
             filename = self.request.path.split('/compiled/', 1)[1]
             compiler_name = filename[filename.index('.'):]
             compiler = self.application.compilers[compiler_name]
-            return compiler(filename)
+            response = compiler(filename)
+            etag = response.headers.get('ETag')
+            if etag is not None and not is_resource_modified(
+                    self.environ, unquote_etag(etag)[0]):
+                return self.response(status=304, headers=[('ETag', etag)])
+            return response
         return super(EnvironmentCompilerMixin, self).__call__()
 
 
@@ -30,6 +64,81 @@ class CompilerMixinBase(object):
         """Mapping of output file extensions to compilers."""
         return {}
 
+    def compiled_sources(self):
+        """Names of the files the :attr:`compilers` can compile, such as
+        ``'main.css'``, for :meth:`build_compiled`."""
+        return []
+
+    @cached_property
+    def compiled_directory(self):
+        """Directory :meth:`build_compiled` writes to, by default
+        :file:`{package}/static/compiled`."""
+        return resource_filename(self.module, 'static/compiled')
+
+    def build_compiled(self):
+        """Compile all :meth:`compiled_sources` into files named by a hash
+        of their content in the :attr:`compiled_directory`, along with a
+        :file:`manifest.json` mapping each source to its file. Hashed files
+        listed in neither this nor the previous manifest are removed, so
+        pages rendered before a deploy can still load theirs. Returns the
+        manifest."""
+        directory = self.compiled_directory
+        if not path.isdir(directory):
+            makedirs(directory)
+        self.__dict__.pop('compiled_manifest', None)
+        previous = self.__read_manifest()
+        manifest = {}
+        for name in self.compiled_sources():
+            extension = name[name.index('.'):]
+            data = self.compilers[extension](name).data
+            hashed = '{0}.{1}{2}'.format(name[:name.index('.')],
+                                         sha1(data).hexdigest()[:12],
+                                         extension)
+            write_atomically(path.join(directory, hashed), data)
+            manifest[name] = 'compiled/' + hashed
+        write_atomically(path.join(directory, 'manifest.json'),
+                         json.dumps(manifest, indent=2, sort_keys=True))
+        keep = set(name.split('/', 1)[1] for name
+                   in manifest.values() + previous.values())
+        for name in listdir(directory):
+            if _hashed_name.match(name) and name not in keep:
+                remove(path.join(directory, name))
+        for name in ('compiled_manifest', '_hashed_static_paths'):
+            self.__dict__.pop(name, None)
+        return manifest
+
+    @cached_property
+    def compiled_manifest(self):
+        """Mapping of compiled files to their content-hashed paths under
+        the ``'static'`` endpoint, as written by :meth:`build_compiled`.
+        Empty in debug mode so changes to the sources show up without a
+        rebuild."""
+        if self.settings.debug:
+            return {}
+        return self.__read_manifest()
+
+    def __read_manifest(self):
+        filename = path.join(self.compiled_directory, 'manifest.json')
+        try:
+            with open(filename) as stream:
+                return json.load(stream)
+        except IOError as e:
+            if e.errno != ENOENT:
+                raise
+            return {}
+
+    @cached_property
+    def _hashed_static_paths(self):
+        return frozenset('/static/' + name
+                         for name in self.compiled_manifest.itervalues())
+
+    def static_max_age(self, path):
+        """Content-hashed files from :meth:`build_compiled` can be cached
+        by browsers for a year."""
+        if path in self._hashed_static_paths:
+            return 365 * 24 * 60 * 60
+        return super(CompilerMixinBase, self).static_max_age(path)
+
 
 from ramverk.inventory import members
 __all__ = members[__name__]
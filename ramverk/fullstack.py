@@ -24,14 +24,22 @@ from ramverk.application import BaseApplication
 from ramverk.compiling   import EnvironmentCompilerMixin
 from ramverk.environment import BaseEnvironment
 from ramverk.genshi      import GenshiMixin
-from ramverk.logbook     import LogbookHandlerMixin, LogbookLoggerMixin
+from ramverk.http        import SAFE_METHODS
+from ramverk.logbook     import BatchingHandler,\
+                                LogbookHandlerMixin,\
+                                LogbookLoggerMixin
 from ramverk.rendering   import RenderingEnvironmentMixin,\
                                 BaseTemplateContext,\
                                 JSONMixin
 from ramverk.routing     import URLMapAdapterMixin, URLHelpersMixin, URLMapMixin
 from ramverk.scss        import SCSSMixin
-from ramverk.session     import SessionMixin, SecretKey
-from ramverk.transaction import TransactionMixin
+from ramverk.session     import SessionCountersMixin,\
+                                SessionMixin,\
+                                SecretKey
+from ramverk.timing      import TimingEnvironmentMixin, TimingMixin
+from ramverk.transaction import ConflictRetryMixin,\
+                                TransactionCountersMixin,\
+                                TransactionMixin
 from ramverk.venusian    import VenusianMixin
 from ramverk.wrappers    import DeferredResponseInitMixin
 from ramverk.wsgi        import SharedDataMixin
@@ -39,6 +47,7 @@ from ramverk.zodb        import ZODBConnectionMixin, ZODBStorageMixin
 
 
 class Environment(LogbookHandlerMixin,
+                  TimingEnvironmentMixin,
                   EnvironmentCompilerMixin,
                   SessionMixin,
                   RenderingEnvironmentMixin,
@@ -84,6 +93,10 @@ class Application(LogbookLoggerMixin,
                   URLMapMixin,
                   VenusianMixin,
                   SharedDataMixin,
+                  ConflictRetryMixin,
+                  TransactionCountersMixin,
+                  SessionCountersMixin,
+                  TimingMixin,
                   BaseApplication):
     """Full-stack application."""
 
@@ -100,16 +113,19 @@ class Application(LogbookLoggerMixin,
         settings = super(Application, self).settings
         settings.storage = lambda: FileStorage(settings.name.lower() + '.db')
         settings.secret_key = SecretKey(settings.name.lower() + '.key')
+        settings.read_only_methods = SAFE_METHODS
         return settings
 
     @cached_property
     def log_handler(self): #pragma: no cover
         """Use colors and alignment in the log during development, and log
-        only warnings and above in production."""
+        only warnings and above in production, written in batches from a
+        background thread."""
         if self.settings.debug:
             return ColorizedStderrHandler(format_string=
                 '{record.level_name:>8}: {record.channel}: {record.message}')
-        return NestedSetup([NullHandler(), StderrHandler(level='WARNING')])
+        return NestedSetup([NullHandler(),
+                            BatchingHandler(StderrHandler(level='WARNING'))])
 
 
 from ramverk.inventory import members
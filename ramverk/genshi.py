@@ -1,9 +1,18 @@
 from __future__        import absolute_import
+from errno             import EEXIST, ENOENT
+from hashlib           import sha1
+from multiprocessing   import Pool
+from os                import makedirs, path, walk
+from time              import time
+from pkg_resources     import resource_filename
 from genshi.filters    import Transformer
 from genshi.input      import HTML
 from genshi.template   import TemplateLoader, MarkupTemplate, NewTextTemplate
+from genshi.template   import Context
 from werkzeug.utils    import cached_property
 from ramverk.rendering import TemplatingMixinBase
+from ramverk.timing    import timed
+from ramverk.utils     import Counter, write_atomically
 
 try:
     from compactxml import expand_to_string
@@ -11,7 +20,71 @@ except ImportError:
     pass
 
 
-class CompactTemplate(MarkupTemplate):
+class ExpansionCache(object):
+    """Directory of template sources expanded to plain markup, keyed by
+    the path and modification time of the source and the template class
+    that expanded it. The `directory` is created if it doesn't exist."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        try:
+            makedirs(directory)
+        except OSError as e:
+            if e.errno != EEXIST:
+                raise
+
+    def filename(self, dialect, filepath):
+        """Path to the cached expansion of `filepath` by `dialect`."""
+        key = '\0'.join([path.abspath(filepath),
+                         repr(path.getmtime(filepath)),
+                         dialect.__module__ + '.' + dialect.__name__])
+        return path.join(self.directory, sha1(key).hexdigest() + '.xml')
+
+    def get(self, dialect, filepath):
+        """The cached expansion of `filepath` or :const:`None`."""
+        try:
+            with open(self.filename(dialect, filepath), 'rb') as stream:
+                return stream.read()
+        except (IOError, OSError) as e:
+            if e.errno != ENOENT:
+                raise
+            return None
+
+    def set(self, dialect, filepath, markup):
+        """Atomically write the expanded `markup` for `filepath`."""
+        if isinstance(markup, unicode):
+            markup = markup.encode('utf-8')
+        write_atomically(self.filename(dialect, filepath), markup)
+
+
+class ExpandedTemplate(MarkupTemplate):
+    """Base for :class:`~genshi.template.markup.MarkupTemplate` dialects
+    that :meth:`expand` their source to plain markup before Genshi parses
+    it. If the loader has an :class:`ExpansionCache` the expanded markup
+    is read from and written to it."""
+
+    def __init__(self, source, filepath=None, filename=None, loader=None,
+                 encoding=None, lookup='strict', allow_exec=True):
+        cache = getattr(loader, 'expansion_cache', None)
+        if cache is None or filepath is None or not path.isfile(filepath):
+            source = self.expand(source)
+        else:
+            markup = cache.get(type(self), filepath)
+            if markup is None:
+                markup = self.expand(source)
+                cache.set(type(self), filepath, markup)
+            source = markup
+        super(ExpandedTemplate, self).__init__(source,
+            filepath=filepath, filename=filename, loader=loader,
+            encoding=encoding, lookup=lookup, allow_exec=allow_exec)
+
+    @classmethod
+    def expand(cls, source):
+        """Return the `source` file, stream or string as plain markup."""
+        raise NotImplementedError
+
+
+class CompactTemplate(ExpandedTemplate):
     """A :class:`~genshi.template.markup.MarkupTemplate` parsing with
     :term:`Compact XML` using preconfigured namespace prefixes."""
 
@@ -25,15 +98,12 @@ class CompactTemplate(MarkupTemplate):
     """Whether the rendered markup should be pretty-printed with
     whitespace."""
 
-    def __init__(self, source, filepath=None, filename=None, loader=None,
-                 encoding=None, lookup='strict', allow_exec=True):
+    @classmethod
+    def expand(cls, source):
         if hasattr(source, 'render'):
             source = source.render()
-        source = expand_to_string(source, self.namespaces,
-                                  prettyPrint=self.pretty_print)
-        super(CompactTemplate, self).__init__(source,
-            filepath=filepath, filename=filename, loader=loader,
-            encoding=encoding, lookup=lookup, allow_exec=allow_exec)
+        return expand_to_string(source, cls.namespaces,
+                                prettyPrint=cls.pretty_print)
 
 
 class CompactHTMLTemplate(CompactTemplate):
@@ -49,21 +119,18 @@ class CompactHTMLTemplate(CompactTemplate):
         form='http://ns.discorporate.us/flatland/genshi')
 
 
-class HTMLTemplate(MarkupTemplate):
+class HTMLTemplate(ExpandedTemplate):
     """A :class:`~genshi.template.markup.MarkupTemplate` parsing with
     :class:`~genshi.input.HTMLParser`."""
 
-    def __init__(self, source, filepath=None, filename=None, loader=None,
-                 encoding=None, lookup='strict', allow_exec=True):
+    @classmethod
+    def expand(cls, source):
         if hasattr(source, 'read'):
             source = source.read()
         elif hasattr(source, 'render'):
             source = source.render()
-        stream = self.filter_html_stream(HTML(source))
-        source = stream.render()
-        super(HTMLTemplate, self).__init__(source,
-            filepath=filepath, filename=filename, loader=loader,
-            encoding=encoding, lookup=lookup, allow_exec=allow_exec)
+        template = cls.__new__(cls)
+        return template.filter_html_stream(HTML(source)).render()
 
     def filter_html_stream(self, stream):
         """Apply filters to the HTML `stream`; this happens earlier than
@@ -78,6 +145,13 @@ class HTMLTemplate(MarkupTemplate):
             .attr('xmlns:form', 'http://ns.discorporate.us/flatland/genshi'))
 
 
+def _expand_into(args):
+    directory, dialect, filepath = args
+    with open(filepath, 'U') as source:
+        markup = dialect.expand(source)
+    ExpansionCache(directory).set(dialect, filepath, markup)
+
+
 class GenshiRenderer(object):
     """Genshi renderer with fixed configuration."""
 
@@ -102,15 +176,23 @@ class GenshiRenderer(object):
         self.mimetype, self.dialect, self.lazy = mimetype, dialect, lazy
 
     def __call__(self, environment, template_name, **context):
-        self.app.update_template_context(environment, context)
-        template = self.app.genshi_loader.load(template_name, cls=self.dialect)
-        stream = template.generate(**context)
-        stream = self.filter(environment, template, stream)
+        context = Context(**context)
+        namespace = self.app.lazy_template_context(environment)
+        self.app.update_template_context(environment, namespace)
+        context.frames.append(namespace)
+        self.app.template_lookups.increment()
+        with timed(environment, 'template'):
+            template = self.app.genshi_loader.load(template_name,
+                                                   cls=self.dialect)
+        with timed(environment, 'generate'):
+            stream = template.generate(context)
+            stream = self.filter(environment, template, stream)
         serialize = stream.serialize if self.lazy else stream.render
-        if self.doctype is None:
-            rendering = serialize(self.serializer)
-        else:
-            rendering = serialize(self.serializer, doctype=self.doctype)
+        with timed(environment, 'serialize'):
+            if self.doctype is None:
+                rendering = serialize(self.serializer)
+            else:
+                rendering = serialize(self.serializer, doctype=self.doctype)
         return self.app.response(rendering, mimetype=self.mimetype)
 
     def filter(self, environment, template, stream):
@@ -128,6 +210,17 @@ class GenshiRenderer(object):
 class GenshiMixin(TemplatingMixinBase):
     """Add Genshi templating to an application."""
 
+    def __create__(self):
+        """Warms the templates with :meth:`warm_genshi_templates` if
+        ``settings.warm_templates`` is set, using that many processes if
+        it is a number."""
+        super(GenshiMixin, self).__create__()
+        processes = self.settings.get('warm_templates')
+        if processes:
+            if processes is True:
+                processes = None
+            self.warm_genshi_templates(processes)
+
     @cached_property
     def renderers(self):
         R = GenshiRenderer
@@ -144,19 +237,96 @@ class GenshiMixin(TemplatingMixinBase):
 
     @cached_property
     def template_loaders(self):
-        """Adds a :func:`~genshi.template.loader.package` loader for the
-        :file:`{application module}/templates` directory."""
+        """Adds the :file:`{application module}/templates` directory."""
         loaders = super(GenshiMixin, self).template_loaders
-        loaders.genshi = [TemplateLoader.package(self.module, 'templates')]
+        loaders.genshi = [resource_filename(self.module, 'templates')]
         return loaders
 
+    @cached_property
+    def expansion_cache(self):
+        """An :class:`ExpansionCache` in the directory configured as
+        ``settings.template_cache``, or :const:`None` if not configured."""
+        directory = self.settings.get('template_cache')
+        if directory is None:
+            return None
+        return ExpansionCache(directory)
+
     @cached_property
     def genshi_loader(self):
         """The ``template_loaders.genshi`` loaders wrapped in a
         :class:`~genshi.template.loader.TemplateLoader`."""
-        return TemplateLoader(self.template_loaders.genshi,
-                              auto_reload=self.settings.debug,
-                              callback=self.configure_genshi_template)
+        loader = TemplateLoader(self.template_loaders.genshi,
+                                auto_reload=self.settings.debug,
+                                callback=self.__loaded)
+        loader.expansion_cache = self.expansion_cache
+        return loader
+
+    @cached_property
+    def template_lookups(self):
+        """:class:`~ramverk.utils.Counter` of templates looked up by the
+        :class:`GenshiRenderer`\ s."""
+        return Counter()
+
+    @cached_property
+    def template_compiles(self):
+        """:class:`~ramverk.utils.Counter` of templates compiled by the
+        :attr:`genshi_loader`, because they weren't cached or changed."""
+        return Counter()
+
+    def __loaded(self, template):
+        self.template_compiles.increment()
+        self.configure_genshi_template(template)
+
+    def iter_genshi_templates(self):
+        """Yield the name, path and dialect of every template in the
+        directories of ``template_loaders.genshi`` that has a
+        :class:`GenshiRenderer` for its file extension."""
+        for directory in self.template_loaders.genshi:
+            if not isinstance(directory, basestring):
+                continue
+            for root, dirs, files in walk(directory):
+                dirs.sort()
+                for name in sorted(files):
+                    renderer = self.renderers.get(path.splitext(name)[1])
+                    if not isinstance(renderer, GenshiRenderer):
+                        continue
+                    filepath = path.join(root, name)
+                    filename = path.relpath(filepath, directory)
+                    yield filename.replace(path.sep, '/'), filepath,\
+                          renderer.dialect
+
+    def warm_genshi_templates(self, processes=None):
+        """Load every template from :meth:`iter_genshi_templates` into the
+        :attr:`genshi_loader` so the first requests after a restart don't
+        pay for compiling them, and log and return a list of ``(filename,
+        seconds)`` pairs. With a number of `processes` and an
+        :attr:`expansion_cache`, templates are first expanded in parallel
+        in a process pool."""
+        templates = list(self.iter_genshi_templates())
+        if processes and self.expansion_cache is not None:
+            directory = self.expansion_cache.directory
+            pool = Pool(processes)
+            try:
+                pool.map(_expand_into,
+                         [(directory, dialect, filepath)
+                          for (filename, filepath, dialect) in templates
+                          if issubclass(dialect, ExpandedTemplate)])
+            finally:
+                pool.close()
+                pool.join()
+        timings = []
+        for filename, filepath, dialect in templates:
+            start = time()
+            try:
+                self.genshi_loader.load(filename, cls=dialect)
+            except Exception:
+                self.log.exception('failed to compile ' + filename)
+                continue
+            seconds = time() - start
+            self.log.info('compiled {0} in {1:.1f} ms'.format(
+                filename, seconds * 1000))
+            timings.append((filename, seconds))
+        return timings
 
     def configure_genshi_template(self, template):
         """Called when `template` is first loaded; override to do Babel and
@@ -9,3 +9,10 @@ HTTP_METHODS = frozenset([
     'PUT',
     'TRACE'
 ])
+
+SAFE_METHODS = frozenset([
+    'GET',
+    'HEAD',
+    'OPTIONS',
+    'TRACE'
+])
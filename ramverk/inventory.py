@@ -29,6 +29,8 @@ members = dict(
         """
         CompactHTMLTemplate
         CompactTemplate
+        ExpandedTemplate
+        ExpansionCache
         GenshiMixin
         GenshiRenderer
         HTMLTemplate
@@ -45,12 +47,21 @@ members = dict(
 
     logbook =
         """
+        BatchingHandler
         LogbookHandlerMixin
         LogbookLoggerMixin
         """,
 
+    metrics =
+        """
+        MetricsMixin
+        TransferCounts
+        """,
+
     paver =
         """
+        build_compiled
+        expand_templates
         routes
         serve
         shell
@@ -60,6 +71,7 @@ members = dict(
         """
         BaseTemplateContext
         JSONMixin
+        LazyTemplateContext
         RenderingEnvironmentMixin
         RenderingMixinBase
         TemplatingMixinBase
@@ -94,11 +106,24 @@ members = dict(
         """
         SecretKey
         SecureJSONCookie
+        SessionCountersMixin
         SessionMixin
+        SessionStore
+        SessionStoreMixin
+        """,
+
+    timing =
+        """
+        Histogram
+        TimingEnvironmentMixin
+        TimingMixin
+        timed
         """,
 
     transaction =
         """
+        ConflictRetryMixin
+        TransactionCountersMixin
         TransactionMixin
         TransactionalMixinBase
         """,
@@ -107,12 +132,16 @@ members = dict(
         """
         Bunch
         Configurable
+        Counter
         EagerCachedProperties
         InitFromArgs
+        LRUCache
         ReprAttributes
         args
         has
+        increment_counter
         super
+        write_atomically
         """,
 
     venusian =
@@ -130,6 +159,7 @@ members = dict(
     wsgi =
         """
         SharedDataMixin
+        SharedFiles
         middleware
         mixin
         """,
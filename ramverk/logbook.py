@@ -1,20 +1,31 @@
 from __future__     import absolute_import
-from logbook        import Logger, default_handler
+from atexit         import register
+from os             import getpid
+from Queue          import Empty, Full, Queue
+from sys            import exc_info
+from threading      import Lock, Thread
+from logbook        import Handler, Logger, NOTSET, StreamHandler,\
+                           default_handler
 from werkzeug.utils import cached_property
+from ramverk.utils  import Counter
 
 
 class LogbookHandlerMixin(object):
     """Environment mixin binding the request to the application's
-    :attr:`~LogbookMixin.log_handler`."""
+    :attr:`~LogbookMixin.log_handler`, unless it was bound to the whole
+    application with :meth:`~LogbookLoggerMixin.bind_log_handler`."""
 
     def __enter__(self):
-        self.application.log_handler.push_thread()
+        if not self.application.log_handler_bound:
+            self.application.log_handler.push_thread()
         return super(LogbookHandlerMixin, self).__enter__()
 
     def __exit__(self, *exc_info):
-        value = super(LogbookHandlerMixin, self).__exit__(*exc_info)
-        self.application.log_handler.pop_thread()
-        return value
+        try:
+            return super(LogbookHandlerMixin, self).__exit__(*exc_info)
+        finally:
+            if not self.application.log_handler_bound:
+                self.application.log_handler.pop_thread()
 
 
 class LogbookLoggerMixin(object):
@@ -30,6 +41,110 @@ class LogbookLoggerMixin(object):
     The default is the Logbook default, which is an
     :class:`~logbook.handlers.StderrHandler`."""
 
+    log_handler_bound = False
+    """Whether :attr:`log_handler` was pushed for the whole application
+    with :meth:`bind_log_handler`."""
+
+    def bind_log_handler(self):
+        """Push :attr:`log_handler` for the whole process once, rather
+        than for the thread of every request. Meant for deployments
+        serving a single application per process."""
+        self.log_handler.push_application()
+        self.log_handler_bound = True
+
+
+class BatchingHandler(Handler):
+    """Handler passing records on to `handler` from a background thread,
+    so that slow log sinks don't stall the threads logging. Records are
+    put in a queue of at most `maxsize` records and handled in batches of
+    up to `batch_size`; if `handler` is a
+    :class:`~logbook.handlers.StreamHandler` each batch is written and
+    flushed at once. When the queue is full records are counted in
+    :attr:`dropped` and discarded, or with `block` the logging thread
+    waits for room. Remaining records are handled on :meth:`close`, which
+    is called when the process exits."""
+
+    def __init__(self, handler, maxsize=10000, batch_size=100, block=False,
+                 level=None, filter=None, bubble=False):
+        if level is None:
+            level = getattr(handler, 'level', NOTSET)
+        Handler.__init__(self, level, filter, bubble)
+        self.handler, self.batch_size, self.block =\
+            handler, batch_size, block
+        self.queue = Queue(maxsize)
+        self.dropped = Counter()
+        self._lock, self._thread, self._pid = Lock(), None, None
+        register(self.close)
+
+    def emit(self, record):
+        record.pull_information()
+        if self._pid != getpid():
+            self.__start()
+        try:
+            self.queue.put(record, self.block)
+        except Full:
+            self.dropped.increment()
+
+    def __start(self):
+        pid = getpid()
+        if self._pid is not None and self._pid != pid:
+            # Forked from a process that had started the thread: neither
+            # it nor the records queued for it exist here, and the lock
+            # may have been held by another thread of the parent.
+            self._lock, self.queue = Lock(), Queue(self.queue.maxsize)
+            self._thread = self._pid = None
+        with self._lock:
+            if self._pid is None:
+                self._thread = Thread(target=self.__handle_batches,
+                                      name='ramverk log writer')
+                self._thread.daemon = True
+                self._thread.start()
+                self._pid = pid
+
+    def __handle_batches(self):
+        while True:
+            records = [self.queue.get()]
+            try:
+                while len(records) < self.batch_size:
+                    records.append(self.queue.get_nowait())
+            except Empty:
+                pass
+            closing = records[-1] is None
+            if closing:
+                records.pop()
+            if records:
+                self.handle_batch(records)
+            if closing:
+                return
+
+    def handle_batch(self, records):
+        """Pass the `records` on to :attr:`handler`."""
+        handler = self.handler
+        records = [record for record in records
+                   if handler.should_handle(record)]
+        if not records:
+            return
+        if isinstance(handler, StreamHandler):
+            try:
+                with handler.lock:
+                    handler.write(''.join(handler.format_and_encode(record)
+                                          for record in records))
+                    handler.flush()
+            except Exception:
+                handler.handle_error(records[-1], exc_info())
+        else:
+            for record in records:
+                handler.handle(record)
+
+    def close(self):
+        """Handle the queued records and stop the background thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            pid, self._pid = self._pid, None
+        if thread is not None and pid == getpid():
+            self.queue.put(None)
+            thread.join()
+
 
 from ramverk.inventory import members
 __all__ = members[__name__]
@@ -0,0 +1,188 @@
+from __future__     import absolute_import
+from threading      import Lock
+from werkzeug.utils import cached_property
+from ramverk.utils  import Bunch
+from ramverk.wsgi   import SharedDataMixin, middleware
+
+
+class TransferCounts(object):
+    """ZODB activity monitor totalling the objects loaded from and stored
+    to the storage by connections as they are closed."""
+
+    def __init__(self):
+        self.loads = self.stores = 0
+        self._lock = Lock()
+
+    def closedConnection(self, connection):
+        loads, stores = connection.getTransferCounts(True)
+        with self._lock:
+            self.loads += loads
+            self.stores += stores
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value)
+
+
+def _escape(value):
+    return unicode(value).replace('\\', r'\\').replace('"', r'\"')\
+                         .replace('\n', r'\n')
+
+
+def _sample(name, value, **labels):
+    if labels:
+        name += '{' + ','.join('{0}="{1}"'.format(label, _escape(text))
+                               for (label, text) in sorted(labels.items()))\
+                    + '}'
+    return u'{0} {1}\n'.format(name, _number(value))
+
+
+_forwarded = ('HTTP_FORWARDED', 'HTTP_X_FORWARDED_FOR', 'HTTP_X_REAL_IP')
+
+
+@middleware
+class MetricsMixin(object):
+    """Application mixin serving metrics about the application in the
+    Prometheus text format on ``settings.metrics_path``, by default
+    :file:`/metrics`, to clients from ``settings.metrics_addresses``, by
+    default only the local host. Requests forwarded by a proxy are
+    refused, since behind a proxy on the same host every client appears
+    to be local. Reports what the other mixins of the application
+    count:
+
+    * request counts and latency histograms per endpoint and phase from a
+      :class:`~ramverk.timing.TimingMixin`, turning on ``settings.timing``
+      unless it was set
+    * connections and cached objects of the pool of a
+      :class:`~ramverk.zodb.ZODBStorageMixin`, and the objects loaded and
+      stored by its connections
+    * transaction outcomes from a
+      :class:`~ramverk.transaction.TransactionCountersMixin` and retries
+      from a :class:`~ramverk.transaction.ConflictRetryMixin`
+    * template lookups and compiles of a :class:`~ramverk.genshi.GenshiMixin`
+      and the hits and misses of the :meth:`metrics_caches`
+
+    The counters are incremented without locks and only read when the
+    metrics are requested. Should be mixed in before the other mixins so
+    that requests for the metrics don't pass through them."""
+
+    metrics_prefix = 'ramverk_'
+    """Prefix of the names of the metrics."""
+
+    def __create__(self):
+        self.settings.setdefault('timing', True)
+        super(MetricsMixin, self).__create__()
+
+    @cached_property
+    def zodb_transfers(self):
+        """The :class:`TransferCounts` of the ZODB connection pool."""
+        return TransferCounts()
+
+    @cached_property
+    def _zodb_connection_pool(self):
+        db = super(MetricsMixin, self)._zodb_connection_pool
+        db.setActivityMonitor(self.zodb_transfers)
+        return db
+
+    def metrics_caches(self):
+        """Mapping of names to caches with `hits` and `misses`
+        :class:`~ramverk.utils.Counter`\ s, such as an
+        :class:`~ramverk.utils.LRUCache`. Override to add your own."""
+        caches = {}
+        shared_files = self._middlewares.get(SharedDataMixin)
+        if shared_files is not None:
+            caches['static'] = shared_files.cache
+        if hasattr(self, 'compiled_hits'):
+            caches['stylesheets'] = Bunch(hits=self.compiled_hits,
+                                          misses=self.compiled_misses)
+        return caches
+
+    def metrics(self):
+        """Generate ``(name, type, samples)`` for each metric, where the
+        samples are ``(suffix, labels, value)`` triples."""
+        if hasattr(self, 'timing_histograms'):
+            requests, phases = [], []
+            for (endpoint, phase), histogram in \
+                    sorted(self.timing_histograms.items()):
+                labels = dict(endpoint=endpoint, phase=phase)
+                if phase == 'total':
+                    requests.append(('', dict(endpoint=endpoint),
+                                     histogram.count))
+                for bound, count in histogram.cumulative():
+                    bucket = dict(labels, le=_number(bound))
+                    phases.append(('_bucket', bucket, count))
+                phases.append(('_sum', labels, histogram.sum))
+                phases.append(('_count', labels, histogram.count))
+            yield 'requests_total', 'counter', requests
+            yield 'request_phase_seconds', 'histogram', phases
+
+        if 'zodb_transfers' in vars(self):
+            pool = self._zodb_connection_pool.pool
+            available = len(pool.available)
+            yield 'zodb_connections', 'gauge', [
+                ('', dict(state='open'), len(pool.all) - available),
+                ('', dict(state='available'), available)]
+            yield 'zodb_pool_size', 'gauge', [('', {}, pool.size)]
+            yield 'zodb_cached_objects', 'gauge', [
+                ('', {}, self._zodb_connection_pool.cacheSize())]
+            yield 'zodb_loads_total', 'counter', [
+                ('', {}, self.zodb_transfers.loads)]
+            yield 'zodb_stores_total', 'counter', [
+                ('', {}, self.zodb_transfers.stores)]
+
+        if hasattr(self, 'transaction_commits'):
+            yield 'transactions_total', 'counter', [
+                ('', dict(outcome='commit'), self.transaction_commits.value),
+                ('', dict(outcome='abort'), self.transaction_aborts.value),
+                ('', dict(outcome='conflict'),
+                 self.transaction_conflicts.value)]
+        if hasattr(self, 'conflict_retries'):
+            yield 'conflict_retries_total', 'counter', [
+                ('', {}, self.conflict_retries.value)]
+            yield 'conflict_failures_total', 'counter', [
+                ('', {}, self.conflict_failures.value)]
+
+        if hasattr(self, 'template_lookups'):
+            yield 'template_lookups_total', 'counter', [
+                ('', {}, self.template_lookups.value)]
+            yield 'template_compiles_total', 'counter', [
+                ('', {}, self.template_compiles.value)]
+        caches = sorted(self.metrics_caches().iteritems())
+        yield 'cache_hits_total', 'counter', [
+            ('', dict(cache=name), cache.hits.value)
+            for (name, cache) in caches]
+        yield 'cache_misses_total', 'counter', [
+            ('', dict(cache=name), cache.misses.value)
+            for (name, cache) in caches]
+
+    def render_metrics(self):
+        """The :meth:`metrics` in the Prometheus text format."""
+        lines = []
+        for name, type, samples in self.metrics():
+            name = self.metrics_prefix + name
+            lines.append(u'# TYPE {0} {1}\n'.format(name, type))
+            for suffix, labels, value in samples:
+                lines.append(_sample(name + suffix, value, **labels))
+        return u''.join(lines)
+
+    def pipeline(self, app):
+        metrics_path = self.settings.get('metrics_path', '/metrics')
+        addresses = frozenset(self.settings.get('metrics_addresses',
+                                                ('127.0.0.1', '::1')))
+
+        def metrics(environ, start_response):
+            if environ.get('PATH_INFO') != metrics_path or \
+                    environ.get('REMOTE_ADDR') not in addresses or \
+                    any(header in environ for header in _forwarded):
+                return app(environ, start_response)
+            response = self.response(self.render_metrics(),
+                content_type='text/plain; version=0.0.4; charset=utf-8')
+            return response(environ, start_response)
+
+        return metrics
+
+
+from ramverk.inventory import members
+__all__ = members[__name__]
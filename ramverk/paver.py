@@ -1,6 +1,6 @@
 from __future__          import absolute_import
 from ast                 import literal_eval
-from paver.easy          import Bunch, options, task, cmdopts
+from paver.easy          import Bunch, options, task, cmdopts, info
 from werkzeug.utils      import import_string
 from ramverk.application import BaseApplication
 
@@ -31,7 +31,7 @@ def _get_application():
         for key, value in options.settings.iteritems():
             try:
                 settings[key] = literal_eval(value)
-            except ValueError:
+            except (ValueError, SyntaxError):
                 settings[key] = value
         app = app(**settings)
     return app
@@ -83,6 +83,31 @@ def shell():
             interact(local=locals)
 
 
+@task
+def expand_templates():
+    """Expand templates into the template cache ahead of deploys."""
+    from ramverk.genshi import ExpandedTemplate
+    app = _get_application()
+    cache = getattr(app, 'expansion_cache', None)
+    if cache is None:
+        raise SystemExit('no template cache configured')
+    for filename, filepath, dialect in app.iter_genshi_templates():
+        if issubclass(dialect, ExpandedTemplate):
+            info('expanding ' + filename)
+            with open(filepath, 'U') as source:
+                cache.set(dialect, filepath, dialect.expand(source))
+
+
+@task
+def build_compiled():
+    """Compile assets into content-hashed static files."""
+    app = _get_application()
+    if not hasattr(app, 'build_compiled'):
+        raise SystemExit('no compilers configured')
+    for name, hashed in sorted(app.build_compiled().iteritems()):
+        info('compiled {0} -> {1}'.format(name, hashed))
+
+
 @task
 def routes():
     """List the application's URL rules."""
@@ -35,10 +35,11 @@ class RenderingEnvironmentMixin(object):
 class BaseTemplateContext(object):
     """Base class for template contexts."""
 
-    def __init__(self, environment):
+    environment = None
+    """The context-bound environment."""
 
+    def __init__(self, environment):
         self.environment = environment
-        """The context-bound environment."""
 
     application = Alias('environment.application',
         ':attr:`~ramverk.environment.BaseEnvironment.application`')
@@ -47,17 +48,87 @@ class BaseTemplateContext(object):
         ':attr:`~ramverk.environment.BaseEnvironment.request`')
 
 
+_context_names_cache = {}
+
+
+def _context_names(context_class):
+    try:
+        return _context_names_cache[context_class]
+    except KeyError:
+        names = frozenset(name for name in dir(context_class)
+                          if not name.startswith('_') or name == '_')
+        _context_names_cache[context_class] = names
+        return names
+
+
+class LazyTemplateContext(object):
+    """Mapping view of a template context object that only resolves the
+    values that are looked up. The names are listed once per context
+    class. Values are resolved at most once, and assigning a name shadows
+    the context object."""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.names = _context_names(type(namespace))
+        self.values = {}
+
+    def __contains__(self, name):
+        return name in self.values or name in self.names
+
+    def __getitem__(self, name):
+        try:
+            return self.values[name]
+        except KeyError:
+            if name not in self.names:
+                raise
+            value = self.values[name] = getattr(self.namespace, name)
+            return value
+
+    def __setitem__(self, name, value):
+        self.values[name] = value
+
+    def __iter__(self):
+        return iter(self.names.union(self.values))
+
+    def __len__(self):
+        return len(self.names.union(self.values))
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+
 class TemplatingMixinBase(RenderingMixinBase):
     """Base class for templating mixins."""
 
     template_context = BaseTemplateContext
     """Template context class."""
 
+    def lazy_template_context(self, environment):
+        """A :class:`LazyTemplateContext` for a :attr:`template_context`
+        bound to `environment`."""
+        return LazyTemplateContext(self.template_context(environment))
+
     def update_template_context(self, environment, context):
-        namespace = self.template_context(environment)
-        for name in dir(namespace):
-            if not name.startswith('_') or name == '_':
-                context.setdefault(name, getattr(namespace, name))
+        """Eagerly add the names of the :attr:`template_context` to
+        `context` where not already set. Renderers that look names up
+        lazily call this with their :class:`LazyTemplateContext`, which
+        already has the names, so overrides can add their own to it
+        without resolving the others."""
+        if isinstance(context, LazyTemplateContext):
+            return
+        namespace = self.lazy_template_context(environment)
+        for name in namespace.names:
+            if name not in context:
+                context[name] = namespace[name]
 
     @cached_property
     def template_loaders(self):
@@ -8,6 +8,7 @@ from werkzeug.routing    import Map, Rule, Submount, Subdomain, EndpointPrefix
 from werkzeug.utils      import cached_property, redirect, import_string
 
 from ramverk.http        import HTTP_METHODS
+from ramverk.timing      import timed
 from ramverk.utils       import Bunch, Alias, Configurable
 from ramverk.venusian    import decorator
 
@@ -70,8 +71,9 @@ class URLMapAdapterMixin(object):
             endpoint = self.endpoint
         except NotFound:
             return super(URLMapAdapterMixin, self).__call__()
-        endpoint = import_string(endpoint)
-        return self.application.dispatch_to_endpoint(self, endpoint)
+        endpoint = self.application.resolve_endpoint(endpoint)
+        with timed(self, 'dispatch'):
+            return self.application.dispatch_to_endpoint(self, endpoint)
 
     @cached_property
     def url_map_adapter(self):
@@ -81,7 +83,8 @@ class URLMapAdapterMixin(object):
 
     @cached_property
     def url_map_adapter_match(self):
-        return self.url_map_adapter.match(return_rule=True)
+        with timed(self, 'route'):
+            return self.url_map_adapter.match(return_rule=True)
 
     @cached_property
     def url_rule(self):
@@ -174,16 +177,45 @@ class URLMapMixin(object):
         :meth:`~werkzeug.routing.Map.is_endpoint_expecting` for example if
         you have a placeholder for a language code in the rule."""
 
+    @cached_property
+    def _resolved_endpoints(self):
+        return {}
+
+    @cached_property
+    def _endpoint_signatures(self):
+        return {}
+
+    def resolve_endpoint(self, endpoint):
+        """Import the object named by the :term:`endpoint name`
+        `endpoint`, remembering it so later requests skip the import."""
+        try:
+            return self._resolved_endpoints[endpoint]
+        except KeyError:
+            resolved = import_string(endpoint)
+            self._resolved_endpoints[endpoint] = resolved
+            return resolved
+
+    def endpoint_arguments(self, endpoint):
+        """Names of the arguments the function or method `endpoint`
+        should be called with. The signature is introspected once per
+        function and then cached."""
+        function = getattr(endpoint, 'im_func', endpoint)
+        try:
+            args = self._endpoint_signatures[function]
+        except KeyError:
+            args = tuple(getargspec(function).args)
+            self._endpoint_signatures[function] = args
+        if ismethod(endpoint):
+            return args[1:]  # 'self'
+        return args
+
     def dispatch_to_endpoint(self, environment, endpoint, **kwargs):
         """Implements the logic for dispatching from an environment to an
         endpoint. Applications can override this to customize how
         endpoints are called."""
         if isclass(endpoint):
             return endpoint(environment)()
-        args = getargspec(endpoint).args
-        if ismethod(endpoint):
-            del args[0]  # 'self'
-        for name in args:
+        for name in self.endpoint_arguments(endpoint):
             if name not in kwargs:
                 kwargs[name] = getattr(environment, name)
         return endpoint(**kwargs)
@@ -1,13 +1,50 @@
 from __future__          import absolute_import
-from errno               import ENOENT
-from pkg_resources       import resource_string, resource_filename
+from errno               import EEXIST, ENOENT
+from hashlib             import sha1
+from os                  import listdir, makedirs, path
+from re                  import compile as regex
+from threading           import Lock
+from pkg_resources       import resource_filename
 from werkzeug.exceptions import abort
+from werkzeug.http       import quote_etag
 from werkzeug.utils      import cached_property
 from ramverk.compiling   import CompilerMixinBase
+from ramverk.utils       import Bunch, Counter, write_atomically
 
 import scss
 
 
+_import_rule = regex(r'@import\s+([^;]+);')
+
+_compile_lock = Lock()
+"""Serialises compiles in the process: pyScss reads its load paths from
+the module global :data:`scss.LOAD_PATHS` which has to be swapped for the
+duration of each compile."""
+
+
+def _imported_files(filename, directories):
+    """Paths to the files imported by the SCSS file `filename`, resolved
+    in the same order as pyScss resolves them."""
+    with open(filename) as stream:
+        source = stream.read()
+    for rule in _import_rule.findall(source):
+        if '..' in rule or '://' in rule or 'url(' in rule:
+            continue
+        for name in rule.split(','):
+            name = name.strip().strip('\'"')
+            dirname, basename = path.split(name)
+            candidates = ['_' + basename + '.scss', basename + '.scss',
+                          '_' + basename, basename]
+            for directory in directories + [path.dirname(filename)]:
+                found = [path.join(directory, dirname, candidate)
+                         for candidate in candidates
+                         if path.isfile(path.join(directory, dirname,
+                                                  candidate))]
+                if found:
+                    yield path.realpath(found[0])
+                    break
+
+
 class SCSSMixin(CompilerMixinBase):
     """Add an SCSS compiler to an application."""
 
@@ -17,28 +54,127 @@ class SCSSMixin(CompilerMixinBase):
         compilers['.css'] = self.__compiler
         return compilers
 
+    def __create__(self):
+        super(SCSSMixin, self).__create__()
+        self.__cache, self.__locks = {}, {}
+
+    @cached_property
+    def compiled_hits(self):
+        """:class:`~ramverk.utils.Counter` of stylesheets served from the
+        memory cache."""
+        return Counter()
+
+    @cached_property
+    def compiled_misses(self):
+        """:class:`~ramverk.utils.Counter` of stylesheets compiled or
+        read from ``settings.compiled_cache``."""
+        return Counter()
+
     @cached_property
-    def _SCSSMixin__parser(self):
+    def _SCSSMixin__load_path(self):
+        return resource_filename(self.module, 'compiled')
+
+    def compiled_sources(self):
+        """Stylesheets in :file:`{package}/compiled` that aren't partials,
+        meaning their name doesn't start with an underscore."""
+        sources = super(SCSSMixin, self).compiled_sources()
+        if path.isdir(self.__load_path):
+            sources.extend(sorted(name[:-5] + '.css'
+                                  for name in listdir(self.__load_path)
+                                  if name.endswith('.scss')
+                                  and not name.startswith('_')))
+        return sources
+
+    def __dependencies(self, filename):
+        """The modification times of `filename` and every file it
+        transitively imports."""
+        mtimes, pending = {}, [path.realpath(filename)]
+        while pending:
+            filename = pending.pop()
+            if filename in mtimes:
+                continue
+            mtimes[filename] = path.getmtime(filename)
+            pending.extend(_imported_files(filename, [self.__load_path]))
+        return tuple(sorted(mtimes.iteritems()))
+
+    def __is_fresh(self, compiled):
+        try:
+            return all(path.getmtime(filename) == mtime
+                       for (filename, mtime) in compiled.dependencies)
+        except OSError:
+            return False
+
+    def __compile(self, filename, dependencies):
+        directory = self.settings.get('compiled_cache')
+        if directory is not None:
+            key = sha1(repr(dependencies)).hexdigest()
+            cached = path.join(directory, key + '.css')
+            try:
+                with open(cached, 'rb') as stream:
+                    return stream.read()
+            except IOError as e:
+                if e.errno != ENOENT:
+                    raise
+        with open(filename) as stream:
+            string = stream.read()
         parser = scss.Scss()
         parser.scss_opts.update(compress=False)
-        return parser
+        with _compile_lock:
+            old = scss.LOAD_PATHS
+            scss.LOAD_PATHS = ','.join([self.__load_path, old])
+            try:
+                css = parser.compile(string)
+            finally:
+                scss.LOAD_PATHS = old
+        if directory is not None:
+            try:
+                makedirs(directory)
+            except OSError as e:
+                if e.errno != EEXIST:
+                    raise
+            write_atomically(cached, css.encode('utf-8'))
+        return css
+
+    def __cached(self, name):
+        compiled = self.__cache.get(name)
+        if compiled is not None:
+            if not self.settings.debug or self.__is_fresh(compiled):
+                return compiled
+
+    def __compiled(self, name):
+        """The compiled stylesheet `name` as a :class:`Bunch` with the
+        `css`, its `etag` and the `dependencies` it was compiled from. Kept
+        in memory and, with ``settings.compiled_cache``, on disk. In debug
+        mode the dependencies are checked for changes on every request.
+        Concurrent requests for a stylesheet that isn't compiled yet wait
+        for a single compile and share its result."""
+        compiled = self.__cached(name)
+        if compiled is not None:
+            self.compiled_hits.increment()
+            return compiled
+        filename = path.join(self.__load_path, name[:-4] + '.scss')
+        if '..' in name or not path.isfile(filename):
+            abort(404)
+        with self.__locks.setdefault(name, Lock()):
+            compiled = self.__cached(name)
+            if compiled is not None:
+                self.compiled_hits.increment()
+                return compiled
+            self.compiled_misses.increment()
+            dependencies = self.__dependencies(filename)
+            css = self.__compile(filename, dependencies)
+            if isinstance(css, unicode):
+                css = css.encode('utf-8')
+            compiled = Bunch(css=css, dependencies=dependencies,
+                             etag=sha1(css).hexdigest())
+            self.__cache[name] = compiled
+            return compiled
 
     def __compiler(self, filename):
-        source = 'compiled/{0}.scss'.format(filename[:-4])
-        try:
-            string = resource_string(self.module, source)
-        except IOError as e:
-            if e.errno == ENOENT:
-                abort(404)
-            raise
-        old = scss.LOAD_PATHS
-        scss.LOAD_PATHS = ','.join([resource_filename(self.module, 'compiled'),
-                                    scss.LOAD_PATHS])
-        try:
-            css = self.__parser.compile(string)
-        finally:
-            scss.LOAD_PATHS = old
-        return self.response(css, mimetype='text/css')
+        compiled = self.__compiled(filename)
+        response = self.response(compiled.css, mimetype='text/css')
+        response.headers['ETag'] = quote_etag(compiled.etag)
+        return response
 
 
 from ramverk.inventory import members
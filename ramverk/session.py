@@ -1,9 +1,21 @@
 import errno
 import os
 
+from atexit                        import register
+from hashlib                       import sha1
+from logbook                       import Logger
+from hmac                          import new as hmac
+from threading                     import Event, Lock, Thread
+from time                          import time
+from BTrees.OOBTree                import OOBTree
+from transaction                   import TransactionManager
+from ZODB.POSException             import ConflictError
 from werkzeug.contrib.securecookie import SecureCookie
+from werkzeug.contrib.sessions     import Session, SessionStore as BaseStore
+from werkzeug.security             import safe_str_cmp
 from werkzeug.utils                import cached_property
 from ramverk.rendering             import json
+from ramverk.utils                 import Counter, increment_counter
 
 
 class SecureJSONCookie(SecureCookie):
@@ -13,22 +25,244 @@ class SecureJSONCookie(SecureCookie):
     serialization_method = json
 
 
+class SessionStore(BaseStore):
+    """Server-side sessions for applications with a
+    :class:`SessionStoreMixin`, kept in a
+    :class:`~BTrees.OOBTree.OOBTree` in the ZODB `db`. Saved sessions are
+    written behind by a background thread every `flush_interval` seconds
+    and when the process exits; writes that fail are logged to `log` and
+    retried with the next flush. Sessions not saved for `max_age` seconds
+    are swept from the database every `sweep_interval` seconds.
+
+    Sessions are read through the ZODB object cache of a connection,
+    which keeps the memory tier current with the sessions other processes
+    have flushed. Until then the last process to flush a session wins."""
+
+    cookie_name = 'session'
+
+    root_key = 'ramverk.sessions'
+
+    def __init__(self, db, max_age=30 * 24 * 60 * 60, flush_interval=5,
+                 sweep_interval=60 * 60, log=None):
+        super(SessionStore, self).__init__()
+        self.db, self.max_age = db, max_age
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self.log = log or Logger(type(self).__name__)
+        self._pending, self._lock = {}, Lock()
+        self._closed, self._flusher = Event(), None
+        self._swept = time()
+
+    def __connection(self):
+        connection = self.db.open(transaction_manager=TransactionManager())
+        root = connection.root()
+        if self.root_key not in root:
+            root[self.root_key] = OOBTree()
+        return connection, root[self.root_key]
+
+    def __session(self, sid, data):
+        return self.session_class(dict(data), sid)
+
+    def get(self, sid, root=None):
+        """The session `sid` as last saved by this process or in the
+        database, read from the ZODB `root` of a connection if given, or
+        a new session if it doesn't exist or expired."""
+        if not self.is_valid_key(sid):
+            return self.new()
+        with self._lock:
+            if sid in self._pending:
+                state = self._pending[sid]
+                if state is None:
+                    return self.new()
+                return self.__session(sid, state[0])
+        state = self.__stored(sid, root)
+        if state is None or state[1] < time() - self.max_age:
+            return self.new()
+        return self.__session(sid, state[0])
+
+    def __stored(self, sid, root):
+        if root is not None:
+            sessions = root.get(self.root_key)
+            return None if sessions is None else sessions.get(sid)
+        connection, sessions = self.__connection()
+        try:
+            return sessions.get(sid)
+        finally:
+            connection.transaction_manager.abort()
+            connection.close()
+
+    def save(self, session):
+        """Queue `session` for the database."""
+        self.__queue(session.sid, (dict(session), time()))
+
+    def delete(self, session):
+        self.__queue(session.sid, None)
+
+    def __queue(self, sid, state):
+        with self._lock:
+            self._pending[sid] = state
+            if self._flusher is None:
+                self._flusher = Thread(target=self.__flush_periodically,
+                                       name='ramverk session flusher')
+                self._flusher.daemon = True
+                self._flusher.start()
+                register(self.close)
+
+    def __flush_periodically(self):
+        while not self._closed.is_set():
+            self._closed.wait(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                self.log.exception('failed to flush sessions')
+
+    def flush(self, attempts=3):
+        """Write the sessions saved or deleted since the last flush to the
+        database, and sweep expired sessions if it's time."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        sweep = time() - self._swept >= self.sweep_interval
+        if not pending and not sweep:
+            return
+        try:
+            self.__write(pending, sweep, attempts)
+        except:
+            with self._lock:
+                for sid, state in pending.iteritems():
+                    self._pending.setdefault(sid, state)
+            raise
+        if sweep:
+            self._swept = time()
+
+    def __write(self, pending, sweep, attempts):
+        connection, sessions = self.__connection()
+        manager = connection.transaction_manager
+        try:
+            for attempt in xrange(1, attempts + 1):
+                try:
+                    for sid, state in pending.iteritems():
+                        if state is not None:
+                            sessions[sid] = state
+                        elif sid in sessions:
+                            del sessions[sid]
+                    if sweep:
+                        self.__sweep(sessions)
+                    manager.commit()
+                    return
+                except ConflictError:
+                    manager.abort()
+                    if attempt == attempts:
+                        raise
+        finally:
+            manager.abort()
+            connection.close()
+
+    def __sweep(self, sessions):
+        expired = time() - self.max_age
+        for sid in [sid for (sid, state) in sessions.iteritems()
+                    if state[1] < expired]:
+            del sessions[sid]
+
+    def close(self):
+        """Stop the background thread and flush what remains."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def __signature(self, sid, secret_key):
+        return hmac(str(secret_key), sid, sha1).hexdigest()
+
+    def load_cookie(self, request, secret_key, root=None):
+        """The session for the signed id in the cookie of `request`, read
+        from `root` if given, or a new session."""
+        sid, _, signature = request.cookies.get(self.cookie_name, '')\
+                                   .encode('ascii', 'ignore').partition('.')
+        if not safe_str_cmp(signature, self.__signature(sid, secret_key)):
+            return self.new()
+        return self.get(sid, root)
+
+    def save_cookie(self, response, session, secret_key):
+        """Save `session` if it was modified, setting a signed cookie with
+        its id on `response` if it is new."""
+        if session.should_save:
+            self.save(session)
+            if session.new:
+                response.set_cookie(self.cookie_name, '.'.join(
+                    [session.sid, self.__signature(session.sid, secret_key)]))
+
+
 class SessionMixin(object):
-    """Environment mixin adding a signed session cookie."""
+    """Environment mixin adding a signed session cookie, or with a
+    :class:`SessionStoreMixin` application a cookie with a signed session
+    id. The cookie is only verified when a view reads the session, and
+    only signed and set on the response when the session was modified, so
+    responses that never touch the session carry no
+    :mailheader:`Set-Cookie` and can be cached by shared proxies."""
 
     @cached_property
     def session(self):
         """A :class:`SecureJSONCookie` signed with the configured
-        :attr:`~settings.secret_key`."""
-        return SecureJSONCookie.load_cookie(
-            self.request, secret_key=self.application.settings.secret_key)
+        :attr:`~settings.secret_key`, or a server-side
+        :class:`~werkzeug.contrib.sessions.Session` from the
+        :class:`SessionStore`."""
+        increment_counter(self.application, 'sessions_loaded')
+        secret_key = self.application.settings.secret_key
+        store = getattr(self.application, 'session_store', None)
+        if store is not None:
+            return store.load_cookie(self.request, secret_key,
+                                     getattr(self, 'persistent', None))
+        return SecureJSONCookie.load_cookie(self.request,
+                                            secret_key=secret_key)
 
     def __call__(self):
         response = super(SessionMixin, self).__call__()
-        self.session.save_cookie(response)
+        if 'session' in vars(self) and self.session.should_save:
+            increment_counter(self.application, 'sessions_saved')
+            if isinstance(self.session, Session):
+                self.application.session_store.save_cookie(
+                    response, self.session,
+                    self.application.settings.secret_key)
+            else:
+                self.session.save_cookie(response)
         return response
 
 
+class SessionCountersMixin(object):
+    """Application mixin counting the requests that used the session of
+    :class:`SessionMixin` environments."""
+
+    @cached_property
+    def sessions_loaded(self):
+        """:class:`~ramverk.utils.Counter` of requests that read the
+        session."""
+        return Counter()
+
+    @cached_property
+    def sessions_saved(self):
+        """:class:`~ramverk.utils.Counter` of requests that modified the
+        session and set its cookie."""
+        return Counter()
+
+
+class SessionStoreMixin(object):
+    """Application mixin keeping the sessions of :class:`SessionMixin`
+    environments server-side in a :class:`SessionStore` in the ZODB
+    storage of a :class:`~ramverk.zodb.ZODBStorageMixin`, configured with
+    the ``session_max_age``, ``session_flush_interval`` and
+    ``session_sweep_interval`` settings. Sessions are read with the ZODB
+    connection of the request, if it has one."""
+
+    @cached_property
+    def session_store(self):
+        options = dict((name, self.settings['session_' + name])
+                       for name in ('max_age', 'flush_interval',
+                                    'sweep_interval')
+                       if 'session_' + name in self.settings)
+        return SessionStore(self._zodb_connection_pool, log=self.log,
+                            **options)
+
+
 class SecretKey(object):
     """Lazily read `filename` for a secret key, writing `bytes` random
     bytes to it if it doesn't exist."""
@@ -0,0 +1,151 @@
+from __future__     import absolute_import
+from bisect         import bisect_left
+from collections    import OrderedDict
+from threading      import Lock
+from timeit         import default_timer
+from werkzeug.utils import cached_property
+
+
+class _NotTimed(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_not_timed = _NotTimed()
+
+
+class _Timed(object):
+
+    __slots__ = ('timings', 'name', 'started')
+
+    def __init__(self, timings, name):
+        self.timings, self.name = timings, name
+
+    def __enter__(self):
+        self.started = default_timer()
+
+    def __exit__(self, *exc_info):
+        elapsed = default_timer() - self.started
+        self.timings[self.name] = self.timings.get(self.name, 0) + elapsed
+
+
+def timed(environment, name):
+    """Context manager adding the time spent in its block to the phase
+    `name` in the :attr:`~TimingEnvironmentMixin.timings` of
+    `environment`. Does nothing unless timing is enabled for the
+    environment."""
+    timings = getattr(environment, 'timings', None)
+    if timings is None:
+        return _not_timed
+    return _Timed(timings, name)
+
+
+class Histogram(object):
+    """Thread-safe histogram counting durations in seconds into
+    `buckets` of upper bounds."""
+
+    default_buckets = (.001, .0025, .005, .01, .025, .05, .1, .25, .5,
+                       1, 2.5, 5, 10)
+
+    def __init__(self, buckets=default_buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count, self.sum = 0, 0.0
+        self._lock = Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def cumulative(self):
+        """``(upper bound, count)`` pairs counting the observations up to
+        each bound, ending with an infinite bound counting them all."""
+        with self._lock:
+            counts = list(self.counts)
+        total, pairs = 0, []
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class TimingEnvironmentMixin(object):
+    """Environment mixin recording the time spent in each phase of a
+    request when ``settings.timing`` is enabled. With
+    ``settings.server_timing`` the timings are also sent in a
+    :mailheader:`Server-Timing` header, and with a :class:`TimingMixin`
+    application they are aggregated per endpoint. Should be mixed in at
+    the top of the inheritance chain so that the timings cover the whole
+    request, including committing the transaction."""
+
+    @cached_property
+    def timings(self):
+        """Mapping of phase names to seconds spent in them during this
+        request, or :const:`None` if timing is disabled."""
+        if self.application.settings.get('timing'):
+            return OrderedDict()
+
+    def __enter__(self):
+        if self.timings is not None:
+            self.__started = default_timer()
+        return super(TimingEnvironmentMixin, self).__enter__()
+
+    def __call__(self):
+        response = super(TimingEnvironmentMixin, self).__call__()
+        if self.timings is not None:
+            self.__response = response
+        return response
+
+    def __exit__(self, *exc_info):
+        try:
+            return super(TimingEnvironmentMixin, self).__exit__(*exc_info)
+        finally:
+            if self.timings is not None:
+                self.__record()
+
+    def __record(self):
+        timings = self.timings
+        timings['total'] = default_timer() - self.__started
+        response = vars(self).get('_TimingEnvironmentMixin__response')
+        if response is not None and \
+                self.application.settings.get('server_timing'):
+            response.headers['Server-Timing'] = ', '.join(
+                '{0};dur={1:.2f}'.format(name, seconds * 1000)
+                for (name, seconds) in timings.iteritems())
+        record = getattr(self.application, 'record_timings', None)
+        endpoint = vars(self).get('endpoint')
+        if record is not None and endpoint is not None:
+            record(endpoint, timings)
+
+
+class TimingMixin(object):
+    """Application mixin aggregating the timings of
+    :class:`TimingEnvironmentMixin` environments into a
+    :class:`Histogram` for each endpoint and phase."""
+
+    @cached_property
+    def timing_histograms(self):
+        """Mapping of ``(endpoint, phase)`` pairs to
+        :class:`Histogram`\ s."""
+        return {}
+
+    def record_timings(self, endpoint, timings):
+        """Observe the `timings` of a request to `endpoint`."""
+        histograms = self.timing_histograms
+        for phase, seconds in timings.iteritems():
+            histogram = histograms.get((endpoint, phase))
+            if histogram is None:
+                histogram = histograms.setdefault((endpoint, phase),
+                                                  Histogram())
+            histogram.observe(seconds)
+
+
+from ramverk.inventory import members
+__all__ = members[__name__]
@@ -1,6 +1,21 @@
-from __future__     import absolute_import
-from transaction    import TransactionManager
-from werkzeug.utils import cached_property
+from __future__          import absolute_import
+from cStringIO           import StringIO
+from random              import uniform
+from sys                 import exc_info as current_exc_info
+from time                import sleep
+from transaction         import TransactionManager
+from transaction.interfaces\
+                         import TransientError
+from werkzeug.utils      import cached_property
+from ramverk.timing      import timed
+from ramverk.utils       import Counter, increment_counter
+
+
+def _joined(transaction):
+    # Whether any data manager joined `transaction`. The transaction
+    # package has no public API for this; relies on the private
+    # Transaction._resources list as of transaction 1.1 through 3.1.
+    return bool(transaction._resources)
 
 
 class TransactionalMixinBase(object):
@@ -18,20 +33,117 @@ class TransactionalMixinBase(object):
 
 
 class TransactionMixin(TransactionalMixinBase):
-    """Environment mixin binding the request to a transaction."""
+    """Environment mixin binding the request to a transaction, counted by
+    a :class:`TransactionCountersMixin` application."""
+
+    @cached_property
+    def read_only(self):
+        """Whether the request is expected not to write anything, by
+        default if the request method is in
+        ``settings.read_only_methods``. Read-only requests don't begin a
+        transaction up front and abort rather than commit it if no data
+        manager joined it. Override to declare individual routes
+        read-only."""
+        methods = self.application.settings.get('read_only_methods', ())
+        return self.request.method in methods
 
     def __enter__(self):
-        self.transaction_manager.begin()
+        if not self.read_only:
+            self.transaction_manager.begin()
         return super(TransactionMixin, self).__enter__()
 
     def __exit__(self, *exc_info):
         manager = self.transaction_manager
-        if exc_info == (None, None, None) and not manager.isDoomed():
-            manager.commit()
-        else:
+        if exc_info != (None, None, None) or manager.isDoomed():
+            manager.abort()
+            increment_counter(self.application, 'transaction_aborts')
+        elif self.read_only and not _joined(manager.get()):
             manager.abort()
+        else:
+            if self.read_only:
+                self.application.log.warning(
+                    'read-only {0} request to {1} wrote to the database'
+                    .format(self.request.method, self.request.path))
+            try:
+                with timed(self, 'commit'):
+                    manager.commit()
+            except:
+                error = current_exc_info()
+                manager.abort()
+                increment_counter(self.application, 'transaction_aborts')
+                if isinstance(error[1], TransientError):
+                    increment_counter(self.application,
+                                      'transaction_conflicts')
+                super(TransactionMixin, self).__exit__(*error)
+                raise error[0], error[1], error[2]
+            increment_counter(self.application, 'transaction_commits')
         return super(TransactionMixin, self).__exit__(*exc_info)
 
 
+class TransactionCountersMixin(object):
+    """Application mixin counting the outcomes of the transactions of
+    :class:`TransactionMixin` environments."""
+
+    @cached_property
+    def transaction_commits(self):
+        """:class:`~ramverk.utils.Counter` of committed transactions."""
+        return Counter()
+
+    @cached_property
+    def transaction_aborts(self):
+        """:class:`~ramverk.utils.Counter` of transactions aborted after
+        an error or a failed commit."""
+        return Counter()
+
+    @cached_property
+    def transaction_conflicts(self):
+        """:class:`~ramverk.utils.Counter` of commits that failed with a
+        :exc:`~transaction.interfaces.TransientError`."""
+        return Counter()
+
+
+class ConflictRetryMixin(object):
+    """Application mixin retrying requests that failed with a
+    :exc:`~transaction.interfaces.TransientError`, such as a ZODB
+    :exc:`~ZODB.POSException.ConflictError`, in a new environment.
+
+    Up to ``settings.conflict_attempts`` attempts are made, sleeping for a
+    random time up to ``settings.conflict_backoff`` seconds doubled for
+    each retry. The request body is buffered so it can be read again."""
+
+    @cached_property
+    def conflict_retries(self):
+        """:class:`~ramverk.utils.Counter` of retried requests."""
+        return Counter()
+
+    @cached_property
+    def conflict_failures(self):
+        """:class:`~ramverk.utils.Counter` of requests that still failed
+        after the last attempt."""
+        return Counter()
+
+    def __call__(self, environ, start_response):
+        attempts = self.settings.get('conflict_attempts', 3)
+        backoff = self.settings.get('conflict_backoff', 0.01)
+        call = super(ConflictRetryMixin, self).__call__
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else ''
+        for attempt in xrange(1, attempts + 1):
+            attempt_environ = dict(environ)
+            attempt_environ['wsgi.input'] = StringIO(body)
+            try:
+                return call(attempt_environ, start_response)
+            except TransientError as error:
+                if attempt == attempts:
+                    self.conflict_failures.increment()
+                    raise
+                self.conflict_retries.increment()
+                self.log.info('retrying {0} after {1}: attempt {2} of {3}'
+                              .format(environ.get('PATH_INFO'),
+                                      type(error).__name__,
+                                      attempt + 1, attempts))
+                sleep(uniform(0, backoff * 2 ** (attempt - 1)))
+
+
 from ramverk.inventory import members
 __all__ = members[__name__]
@@ -1,5 +1,10 @@
 import __builtin__ as builtins
+from collections import OrderedDict
 from inspect import currentframe, getmro, isfunction, isclass, isroutine
+from itertools import count
+from os import chmod, path, rename
+from tempfile import NamedTemporaryFile
+from threading import Lock
 from werkzeug.utils import cached_property
 
 
@@ -143,5 +148,105 @@ def args(*names):
     return decorator
 
 
+class LRUCache(object):
+    """Thread-safe mapping that discards the least recently used items
+    when the total size of the values exceeds `maxsize`. The size of a
+    value is measured with `sizeof`, by default counting every value as
+    one. Values larger than `maxsize` are not cached at all. Lookups are
+    counted in the :attr:`hits` and :attr:`misses`
+    :class:`Counter`\ s."""
+
+    def __init__(self, maxsize, sizeof=None):
+        self.maxsize = maxsize
+        self.sizeof = sizeof or (lambda value: 1)
+        self.size = 0
+        self.hits, self.misses = Counter(), Counter()
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                item = self._items.pop(key)
+            except KeyError:
+                self.misses.increment()
+                raise
+            self._items[key] = item
+        self.hits.increment()
+        return item[0]
+
+    def __setitem__(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self.size -= self._items.pop(key)[1]
+            if size > self.maxsize:
+                return
+            self._items[key] = value, size
+            self.size += size
+            while self.size > self.maxsize:
+                self.size -= self._items.popitem(last=False)[1][1]
+
+    def __delitem__(self, key):
+        with self._lock:
+            self.size -= self._items.pop(key)[1]
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+def write_atomically(filename, data, mode=0644):
+    """Write the bytes `data` to `filename` by renaming a temporary file
+    in the same directory, so readers never see a partial file. The file
+    gets the permission `mode` rather than the private mode of temporary
+    files so that web servers can read it."""
+    with NamedTemporaryFile(dir=path.dirname(filename) or '.',
+                            delete=False) as stream:
+        stream.write(data)
+    chmod(stream.name, mode)
+    rename(stream.name, filename)
+
+
+class Counter(object):
+    """Monotonic counter that can be incremented from many threads without
+    a lock, relying on :func:`itertools.count` advancing atomically."""
+
+    def __init__(self):
+        self._count = count()
+
+    def increment(self):
+        next(self._count)
+
+    @property
+    def value(self):
+        """The number of increments so far."""
+        return self._count.__reduce__()[1][0]
+
+    def __repr__(self):
+        return '<Counter {0}>'.format(self.value)
+
+
+def increment_counter(obj, name):
+    """Increment the :class:`Counter` attribute `name` of `obj`, if it
+    has one."""
+    counter = getattr(obj, name, None)
+    if counter is not None:
+        counter.increment()
+
+
 from ramverk.inventory import members
 __all__ = members[__name__]
@@ -1,5 +1,16 @@
+from __future__     import absolute_import
+from datetime       import datetime
+from mimetypes      import guess_type
+from os             import path, stat
+from stat           import S_ISREG
+from time           import time
+from zlib           import adler32
+from pkg_resources  import resource_filename
+from werkzeug.http  import http_date, is_resource_modified,\
+                           parse_accept_header
 from werkzeug.utils import cached_property
-from werkzeug.wsgi  import SharedDataMiddleware, responder
+from werkzeug.wsgi  import responder, wrap_file
+from ramverk.utils  import LRUCache
 
 
 def mixin(middleware):
@@ -46,6 +57,145 @@ def middleware(mixin):
     return mixin
 
 
+class _SharedFile(object):
+
+    __slots__ = ('filename', 'mtime', 'size', 'etag', 'data', 'gzipped')
+
+    def __init__(self, filename, info, data=None):
+        self.filename, self.data, self.gzipped = filename, data, None
+        self.mtime, self.size = info.st_mtime, info.st_size
+        self.etag = '{0:x}-{1:x}-{2:x}'.format(
+            int(info.st_mtime), info.st_size, adler32(filename) & 0xffffffff)
+
+    def sizeof(self):
+        """Bytes kept in memory for the file and its gzipped sibling."""
+        size = len(self.data or '') + 1
+        if self.gzipped is not None:
+            size += self.gzipped.sizeof()
+        return size
+
+
+class SharedFiles(object):
+    """WSGI middleware serving the static files in `exports` like
+    :class:`~werkzeug.wsgi.SharedDataMiddleware`, but resolving the
+    exports once and keeping files of up to `max_file_size` bytes in an
+    in-memory :class:`~ramverk.utils.LRUCache` of `cache_size` bytes.
+    Larger files are streamed with :func:`~werkzeug.wsgi.wrap_file`, which
+    uses the server's ``wsgi.file_wrapper`` if it has one. A :file:`.gz`
+    sibling of a file is sent instead to clients that accept gzip.
+
+    Files are looked up on disk only the first time they are requested,
+    after which conditional requests are answered from memory. With
+    `check_modified` every request checks the modification time, which is
+    useful during development. The :mailheader:`Cache-Control` max age is
+    `max_age` seconds unless the callable `max_age_for` returns another
+    number for the requested path."""
+
+    def __init__(self, app, exports, cache_size=4 * 1024 * 1024,
+                 max_file_size=64 * 1024, max_age=60 * 60 * 12,
+                 max_age_for=None, check_modified=False):
+        self.app = app
+        self.exports = []
+        for mount, target in exports.iteritems():
+            if isinstance(target, tuple):
+                target = resource_filename(*target)
+            self.exports.append((mount.rstrip('/'), target))
+        self.exports.sort(key=lambda export: -len(export[0]))
+        self.cache = LRUCache(cache_size, sizeof=_SharedFile.sizeof)
+        self.max_file_size = max_file_size
+        self.max_age, self.max_age_for = max_age, max_age_for
+        self.check_modified = check_modified
+
+    def filename(self, path_info):
+        """The file exported for `path_info`, or :const:`None`."""
+        for mount, target in self.exports:
+            if path_info == mount:
+                return target
+            if path_info.startswith(mount + '/'):
+                parts = path_info[len(mount) + 1:].split('/')
+                if any(part in ('', '.', '..') or path.sep in part
+                       or (path.altsep and path.altsep in part)
+                       for part in parts):
+                    return None
+                return path.join(target, *parts)
+
+    def load(self, filename):
+        """Stat and, if small enough, read `filename` and its :file:`.gz`
+        sibling. Returns :const:`None` if it isn't a regular file."""
+        try:
+            info = stat(filename)
+        except OSError:
+            return None
+        if not S_ISREG(info.st_mode):
+            return None
+        data = None
+        if info.st_size <= self.max_file_size:
+            with open(filename, 'rb') as stream:
+                data = stream.read()
+        entry = _SharedFile(filename, info, data)
+        if not filename.endswith('.gz'):
+            entry.gzipped = self.load(filename + '.gz')
+        return entry
+
+    def lookup(self, filename):
+        entry = self.cache.get(filename)
+        if entry is not None and self.check_modified:
+            try:
+                if stat(filename).st_mtime != entry.mtime:
+                    entry = None
+            except OSError:
+                entry = None
+        if entry is None:
+            entry = self.load(filename)
+            if entry is not None:
+                self.cache[filename] = entry
+        return entry
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD', 'GET') not in ('GET', 'HEAD'):
+            return self.app(environ, start_response)
+        path_info = environ.get('PATH_INFO', '')
+        filename = self.filename(path_info)
+        entry = filename and self.lookup(filename)
+        if not entry:
+            return self.app(environ, start_response)
+
+        max_age = self.max_age_for and self.max_age_for(path_info)
+        if max_age is None:
+            max_age = self.max_age
+        headers = [('Date', http_date()),
+                   ('Cache-Control', 'public, max-age={0}'.format(max_age))]
+
+        sent = entry
+        if entry.gzipped is not None:
+            headers.append(('Vary', 'Accept-Encoding'))
+            accepted = parse_accept_header(
+                environ.get('HTTP_ACCEPT_ENCODING'))
+            if accepted['gzip']:
+                sent = entry.gzipped
+                headers.append(('Content-Encoding', 'gzip'))
+
+        etag = sent.etag
+        headers.append(('ETag', '"{0}"'.format(etag)))
+        last_modified = datetime.utcfromtimestamp(int(entry.mtime))
+        if not is_resource_modified(environ, etag,
+                                    last_modified=last_modified):
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers.extend([
+            ('Expires', http_date(time() + max_age)),
+            ('Content-Type', guess_type(entry.filename)[0] or 'text/plain'),
+            ('Content-Length', str(sent.size)),
+            ('Last-Modified', http_date(last_modified))])
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        if sent.data is not None:
+            return [sent.data]
+        return wrap_file(environ, open(sent.filename, 'rb'))
+
+
 @middleware
 class SharedDataMixin(object):
     """Serve static files for an application."""
@@ -66,12 +216,22 @@ class SharedDataMixin(object):
         """Mapping of public paths to files/directories or tuples of
         ``(module, directory)``. The default serves up the `static`
         directory under the application module on ``/static``. See
-        :class:`~werkzeug.wsgi.SharedDataMiddleware` for more
-        information."""
+        :class:`SharedFiles` for more information."""
         return {'/static': (self.module, 'static')}
 
+    def static_max_age(self, path):
+        """The number of seconds browsers may cache the static file at the
+        request `path` without revalidating, or :const:`None` for the
+        defaults of the middleware. Override to serve files with
+        content-hashed names with a far-future :mailheader:`Cache-Control`.
+        """
+
     def pipeline(self, app):
-        return SharedDataMiddleware(app, self.shared_data)
+        return SharedFiles(app, self.shared_data,
+                           cache_size=self.settings.get('static_cache_size',
+                                                        4 * 1024 * 1024),
+                           max_age_for=self.static_max_age,
+                           check_modified=self.settings.debug)
 
 
 from ramverk.inventory import members
@@ -1,6 +1,7 @@
 from __future__          import absolute_import
 from ZODB.DB             import DB
 from werkzeug.utils      import cached_property
+from ramverk.timing      import timed
 from ramverk.transaction import TransactionalMixinBase
 
 
@@ -15,13 +16,23 @@ class ZODBConnectionMixin(TransactionalMixinBase):
         if __debug__:
             self.application.log.debug('connecting ZODB')
         self._zodb_connected = True
-        return self.application._zodb_connection_pool.open(
-            transaction_manager=self.transaction_manager)
+        with timed(self, 'zodb-open'):
+            connection = self.application._zodb_connection_pool.open(
+                transaction_manager=self.transaction_manager)
+        if getattr(self, 'timings', None) is not None:
+            setstate = connection.setstate
+            def timed_setstate(object):
+                with timed(self, 'zodb-load'):
+                    return setstate(object)
+            connection.setstate = timed_setstate
+        return connection
 
     def __exit__(self, *exc_info):
         if self._zodb_connected:
             if __debug__:
                 self.application.log.debug('disconnecting ZODB')
+            if 'setstate' in vars(self._zodb_connection):
+                del self._zodb_connection.setstate
             self._zodb_connection.close()
         return super(ZODBConnectionMixin, self).__exit__(*exc_info)
 
@@ -1,19 +1,21 @@
 from __future__          import absolute_import
+from hashlib             import sha1
 from pkg_resources       import resource_filename
 
 from relvlast.babel      import patch
 patch()
 
 from babel               import Locale
-from babel.support       import Translations
 from creoleparser        import Parser, creole11_base
 from flatland.out.genshi import setup as setup_flatland
+from genshi.core         import Markup
 from genshi.filters      import Translator
 from werkzeug.routing    import Rule
 from werkzeug.utils      import cached_property
 from ramverk             import fullstack
 from ramverk.local       import Proxy, current
-from ramverk.utils       import Alias
+from ramverk.utils       import Alias, LRUCache
+from relvlast.catalogs   import MessageCatalogs
 from relvlast.objects    import Root
 
 
@@ -33,18 +35,19 @@ class Environment(fullstack.Environment):
 
     @cached_property
     def message_catalog(self):
-        dirname = resource_filename(self.application.module, 'translations')
-        return Translations.load(dirname, [self.locale])
+        return self.application.message_catalogs[self.locale]
 
     @cached_property
-    def creole_parser(self):
-        return Parser(creole11_base(
-            wiki_links_base_url=self.path(':index')))
+    def wiki_links_base_url(self):
+        return self.path(':index')
+
+    def creole(self, text):
+        return self.application.render_creole(self.wiki_links_base_url, text)
 
 
 class TemplateContext(fullstack.TemplateContext):
 
-    creole = Alias('environment.creole_parser.generate')
+    creole = Alias('environment.creole')
 
     locale = Alias('environment.locale')
 
@@ -60,10 +63,54 @@ class Relvlast(fullstack.Application):
 
     template_context = TemplateContext
 
+    @cached_property
+    def settings(self):
+        settings = super(Relvlast, self).settings
+        settings.creole_cache_size = 4 * 1024 * 1024
+        return settings
+
+    @cached_property
+    def message_catalogs(self):
+        dirname = resource_filename(self.module, 'translations')
+        return MessageCatalogs(dirname, auto_reload=self.settings.debug)
+
+    @cached_property
+    def creole_cache(self):
+        """Rendered creole markup keyed by base URL and a hash of the
+        source, bounded to ``settings.creole_cache_size`` characters."""
+        return LRUCache(self.settings.creole_cache_size, sizeof=len)
+
+    @cached_property
+    def _creole_parsers(self):
+        return {}
+
+    def creole_parser(self, base_url):
+        """A creole parser linking wiki words relative to `base_url`,
+        shared by all requests."""
+        try:
+            return self._creole_parsers[base_url]
+        except KeyError:
+            parser = Parser(creole11_base(wiki_links_base_url=base_url))
+            self._creole_parsers[base_url] = parser
+            return parser
+
+    def render_creole(self, base_url, text):
+        """Render the creole `text` to markup, reusing earlier renderings
+        of the same source from the :attr:`creole_cache`."""
+        key = base_url, sha1(text.encode('utf-8')).digest()
+        try:
+            return self.creole_cache[key]
+        except KeyError:
+            parser = self.creole_parser(base_url)
+            markup = Markup(parser.render(text, method='html', encoding=None))
+            self.creole_cache[key] = markup
+            return markup
+
     def configure(self):
         self.url_map.add(Rule('/', redirect_to='jbo'))
         self.scan('relvlast.frontend', submount='/<locale>')
         self.scan('relvlast.dictionary', submount='/<locale>/vlaste')
+        self.message_catalogs.warm()
 
     def configure_genshi_template(self, template):
         setup_flatland(template)
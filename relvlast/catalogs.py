@@ -0,0 +1,62 @@
+from __future__    import absolute_import
+from gettext       import find
+from os            import listdir, stat
+from os.path       import isdir, join
+from threading     import Lock
+from babel.support import Translations
+
+
+class MessageCatalogs(object):
+    """Process-wide registry of message catalogs in `dirname`, keyed by
+    locale. Each catalog is loaded once and shared by all requests. With
+    `auto_reload` the compiled catalog is checked for a new modification
+    time on every lookup and loaded again if it changed."""
+
+    domain = Translations.DEFAULT_DOMAIN
+
+    def __init__(self, dirname, auto_reload=False):
+        self.dirname, self.auto_reload = dirname, auto_reload
+        self.catalogs = {}
+        self.lock = Lock()
+
+    def __getitem__(self, locale):
+        locale = str(locale)
+        try:
+            catalog, mtime = self.catalogs[locale]
+        except KeyError:
+            return self.load(locale)
+        if self.auto_reload and self.mtime(locale) != mtime:
+            return self.load(locale)
+        return catalog
+
+    def mtime(self, locale):
+        filename = find(self.domain, self.dirname, [locale])
+        if filename is None:
+            return None
+        return stat(filename).st_mtime
+
+    def load(self, locale):
+        """Load the catalog for `locale` unless another thread already
+        loaded the current version."""
+        with self.lock:
+            mtime = self.mtime(locale)
+            if locale in self.catalogs:
+                catalog, loaded = self.catalogs[locale]
+                if loaded == mtime:
+                    return catalog
+            catalog = Translations.load(self.dirname, [locale], self.domain)
+            self.catalogs[locale] = catalog, mtime
+            return catalog
+
+    def locales(self):
+        """Locales that have a directory in :attr:`dirname`."""
+        return [name for name in listdir(self.dirname)
+                if isdir(join(self.dirname, name))]
+
+    def warm(self, locales=None):
+        """Load the catalogs for `locales`, by default all
+        :meth:`locales`."""
+        if locales is None:
+            locales = self.locales()
+        for locale in locales:
+            self[locale]
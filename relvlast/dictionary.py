@@ -1,17 +1,54 @@
+from itertools           import islice
+from BTrees.OOBTree      import intersection
 from werkzeug.exceptions import NotFound
 from ramverk.routing     import get
 
 
+per_page = 50
+
+
+def requested_page(request):
+    """The page number requested with ``papri``, at least one."""
+    return max(request.args.get('papri', 1, type=int), 1)
+
+
+def paginate(request, names):
+    """The names on the requested page of the sorted set `names`, and the
+    number of pages."""
+    end = per_page * requested_page(request)
+    return (islice(names, end - per_page, end),
+            (len(names) + per_page - 1) // per_page)
+
+
 @get('/')
 def index(request, render, translations):
-    words = translations.words.values()
-    page = request.args.get('papri', 1, type=int)
-    per = 50
-    end = per * page
-    start = end - per
-    total = len(words) / per
+    after = request.args.get('lidne')
+    if after is not None:
+        page = None
+        words = translations.words.page_after(after, per_page)
+    else:
+        page = requested_page(request)
+        words = translations.words.page(page, per_page)
     return render('dictionary/index.html',
-                  words=words[start:end],
+                  words=[versions for (name, versions) in words],
+                  page=page,
+                  total=translations.words.pages(per_page),
+                  last=words[-1][0] if len(words) == per_page else None)
+
+
+@get('/sisku')
+def search(request, render, translations):
+    query = request.args.get('q', u'').strip()
+    catalog = translations.words.catalog
+    if not query or catalog is None or catalog.text is None:
+        names = ()
+    else:
+        names = catalog.text.search(query)
+    names, total = paginate(request, names)
+    return render('dictionary/search.html',
+                  query=query,
+                  words=[translations.words.latest(name) for name in names],
+                  page=requested_page(request),
                   total=total)
 
 
@@ -29,3 +66,36 @@ def word(render, db, translations, segments, request, redirect):
         return render('dictionary/word.html',
                       translation=translation,
                       word=word)
+
+
+def browse(request, render, db, translations, attribute, value, heading):
+    try:
+        names = db.properties.words.catalog[attribute][value]
+    except (KeyError, TypeError):
+        raise NotFound
+    names, total = paginate(request,
+                            intersection(names, translations.words.histories))
+    return render('dictionary/browse.html',
+                  heading=heading,
+                  value=value,
+                  words=[translations.words.latest(name) for name in names],
+                  page=requested_page(request),
+                  total=total)
+
+
+@get('/vlatai/<type>/')
+def word_type(request, render, db, translations, segments):
+    return browse(request, render, db, translations,
+                  'type', segments.type, 'vlatai')
+
+
+@get('/selmaho/<class_>/')
+def word_class(request, render, db, translations, segments):
+    return browse(request, render, db, translations,
+                  'class_', segments.class_, "selma'o")
+
+
+@get('/rafsi/<affix>/')
+def affix(request, render, db, translations, segments):
+    return browse(request, render, db, translations,
+                  'affixes', segments.affix, 'rafsi')
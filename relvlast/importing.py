@@ -1,6 +1,10 @@
 import re
 
-from lxml             import objectify
+from multiprocessing  import Pool
+from sys              import exc_info
+from time             import time
+from lxml             import etree
+from ramverk.utils    import Bunch
 from relvlast.objects import Language, WordProperties, Translation
 
 
@@ -12,25 +16,165 @@ def linkify(text):
     return re.sub(r'\{(.+?)\}', r'[[\1]]', unicode(text))
 
 
-def words_from_xml(filename, db, locale):
+def read_words(filename):
+    """Generate a :class:`~ramverk.utils.Bunch` for each word in the XML
+    export `filename`, parsing it incrementally and discarding elements
+    once read so memory use doesn't grow with the size of the export."""
+    with open(filename, 'rb') as stream:
+        for event, valsi in etree.iterparse(stream, tag='valsi'):
+            notes = valsi.findtext('notes')
+            yield Bunch(id=unicode(valsi.get('word')),
+                        type=unicode(valsi.get('type')),
+                        class_=valsi.findtext('selmaho'),
+                        affixes=tuple(str(affix.text)
+                                      for affix in valsi.iterfind('rafsi')),
+                        definition=creolify(valsi.findtext('definition')),
+                        notes=notes and linkify(creolify(notes)))
+            valsi.clear()
+            while valsi.getprevious() is not None:
+                del valsi.getparent()[0]
+
+
+def _read_all_words(filename):
+    return list(read_words(filename))
+
+
+def import_order(locales, properties_locale='jbo'):
+    """The `locales` sorted with `properties_locale` first, so that word
+    properties are first saved from the export they are taken from."""
+    return sorted(locales, key=lambda locale: (locale != properties_locale,
+                                               locale))
+
+
+def read_locales(filenames, processes=None, properties_locale='jbo'):
+    """Read the words of many exports in a pool of `processes` worker
+    processes, by default one per CPU, given a mapping of locales to
+    filenames. Generates ``(locale, words)`` pairs in
+    :func:`import_order` as soon as each is ready, so a single writer can
+    start saving the first locale while the others are still being
+    parsed."""
+    pool = Pool(processes)
+    try:
+        results = [(locale, pool.apply_async(_read_all_words,
+                                             (filenames[locale],)))
+                   for locale in import_order(filenames, properties_locale)]
+        pool.close()
+        for locale, result in results:
+            yield locale, result.get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def save_words(words, db, locale, transaction_manager, batch_size=500,
+               start_after=None, report=None, properties_locale='jbo'):
+    """Save the `words` records from :func:`read_words` as translations
+    into `locale` with :func:`save_word`, taking the word properties from
+    the export of `properties_locale`. Commits with the
+    `transaction_manager` of the connection of `db` every `batch_size`
+    words. If a word fails its batch is aborted and reported before the
+    error is raised, so the import can be resumed by passing the last
+    reported word as `start_after`. If given, `report` is called after
+    each commit or abort with the committed counts so far, the seconds
+    elapsed and the last word committed.
+    Returns a :class:`~ramverk.utils.Bunch` counting the words that were
+    ``added``, ``changed`` and ``unchanged``."""
+    manager = transaction_manager
 
     if locale not in db.translations:
-        language = db.translations[locale] = Language(locale)
-
-    tree = objectify.parse(filename)
-    root = tree.getroot()
-    for valsi in root.direction.valsi:
-        id = valsi.attrib['word']
-
-        if id not in db.properties.words:
-            word = WordProperties(id, valsi.attrib['type'])
-            if hasattr(valsi, 'selmaho'):
-                word.class_ = unicode(valsi.selmaho)
-            if hasattr(valsi, 'rafsi'):
-                word.affixes = tuple(str(affix) for affix in valsi.rafsi)
-            db.properties.words.save(id, word)
-
-        translation = Translation(id, creolify(valsi.definition))
-        if hasattr(valsi, 'notes'):
-            translation.notes = linkify(creolify(valsi.notes))
-        language.words.save(id, translation)
+        db.translations[locale] = Language(locale)
+    language = db.translations[locale]
+    authoritative = locale == properties_locale
+
+    counts = Bunch(added=0, changed=0, unchanged=0)
+    committed = Bunch(counts=Bunch(counts), last=start_after)
+    read, started = 0, time()
+
+    def reported():
+        if report is not None:
+            report(committed.counts, time() - started, committed.last)
+
+    def commit(last):
+        manager.commit()
+        db._p_jar.cacheGC()
+        committed.update(counts=Bunch(counts), last=last)
+        reported()
+
+    for word in words:
+        if start_after is not None:
+            if word.id == start_after:
+                start_after = None
+            continue
+
+        try:
+            counts[save_word(word, db, language, authoritative)] += 1
+        except:
+            error = exc_info()
+            manager.abort()
+            reported()
+            raise error[0], error[1], error[2]
+
+        read += 1
+        if read % batch_size == 0:
+            commit(word.id)
+
+    if read % batch_size:
+        commit(word.id)
+    return counts
+
+
+def _changed_properties(word, current):
+    """New :class:`WordProperties` for the `word` record, or :const:`None`
+    if they are the same as the `current` ones."""
+    class_ = word.class_ and unicode(word.class_)
+    affixes = word.affixes or None
+    if current is not None and (current.type, current.class_,
+                                current.affixes) == (word.type, class_,
+                                                     affixes):
+        return None
+    properties = WordProperties(word.id, word.type)
+    if class_ is not None:
+        properties.class_ = class_
+    if affixes is not None:
+        properties.affixes = affixes
+    return properties
+
+
+def save_word(word, db, language, authoritative=True):
+    """Save the `word` record unless the latest versions of its properties
+    and translation in `language` are the same. The properties are only
+    updated from an `authoritative` record, or set if the word has none;
+    the exports don't always agree on them, with for example ``UI*`` in
+    the Lojban export for ``UI*1`` in the English one. Returns
+    ``'added'`` for words new to the language, ``'changed'`` or
+    ``'unchanged'``."""
+    properties = None
+    if authoritative or word.id not in db.properties.words:
+        current = None
+        if word.id in db.properties.words:
+            current = db.properties.words.latest(word.id)
+        properties = _changed_properties(word, current)
+        if properties is not None:
+            db.properties.words.save(word.id, properties)
+
+    if word.id not in language.words:
+        status = 'added'
+    else:
+        current = language.words.latest(word.id)
+        if (current.definition, current.notes) \
+                == (word.definition, word.notes):
+            return 'changed' if properties is not None else 'unchanged'
+        status = 'changed'
+
+    translation = Translation(word.id, word.definition)
+    if word.notes is not None:
+        translation.notes = word.notes
+    language.words.save(word.id, translation)
+    return status
+
+
+def words_from_xml(filename, db, locale, transaction_manager, **options):
+    """Stream the words in `filename` into `locale` with
+    :func:`save_words`."""
+    return save_words(read_words(filename), db, locale, transaction_manager,
+                      **options)
@@ -1,7 +1,14 @@
+import re
+
+from calendar       import timegm
 from datetime       import datetime
+from itertools      import islice
+from random         import randint
 from persistent     import Persistent
-from BTrees.OOBTree import OOBTree
+from BTrees.OOBTree import OOBTree, OOTreeSet, intersection
 from BTrees.IOBTree import IOBTree
+from BTrees.LOBTree import LOBTree
+from BTrees.Length  import Length
 from ramverk.utils  import EagerCachedProperties, ReprAttributes, has
 from ramverk.utils  import InitFromArgs, args
 
@@ -29,6 +36,10 @@ class List(Base, IOBTree):
             return None
         return self[self.maxKey()]
 
+    @property
+    def latest(self):
+        return self.last.object
+
     @property
     def id(self):
         if not self:
@@ -39,6 +50,40 @@ class List(Base, IOBTree):
         self[self.id + 1] = object
 
 
+class VersionList(Base, LOBTree):
+    """Versions keyed by their timestamp in microseconds, times a thousand
+    plus a random suffix. Concurrent saves thus insert distinct keys which
+    the BTree can merge on conflict, unlike :class:`List` where every save
+    writes to ``maxKey() + 1``."""
+
+    @property
+    def last(self):
+        if not self:
+            return None
+        return self[self.maxKey()]
+
+    @property
+    def latest(self):
+        return self.last.object
+
+    def save(self, version):
+        timestamp = version.timestamp
+        key = (timegm(timestamp.utctimetuple()) * 1000000
+               + timestamp.microsecond) * 1000
+        if self and key <= self.maxKey():
+            key = (self.maxKey() // 1000 + 1) * 1000
+        key += randint(0, 999)
+        self[key] = version
+        return key
+
+    @classmethod
+    def from_versions(cls, versions):
+        versions_list = cls()
+        for version in versions:
+            versions_list.save(version)
+        return versions_list
+
+
 @args('object')
 @has(timestamp=datetime.utcnow)
 class Version(Object):
@@ -46,17 +91,281 @@ class Version(Object):
     pass
 
 
-class VersionedObjects(Collection):
+@args('history', 'latest', 'key')
+class Versions(Object):
+    """The :class:`VersionList` `history` of a name along with the object
+    of its `latest` version and that version's `key`, so the latest object
+    can be looked up without loading the history. Concurrent saves are
+    resolved in favour of the version with the larger key while the
+    history BTree merges both."""
+
+    def save(self, version):
+        self.key = self.history.save(version)
+        self.latest = version.object
+
+    @property
+    def last(self):
+        return self.history.last
+
+    @classmethod
+    def from_history(cls, history=None):
+        """Wrap `history`, converting a legacy :class:`List`."""
+        if history is None:
+            return cls(VersionList())
+        if not isinstance(history, VersionList):
+            history = VersionList.from_versions(history.values())
+        if not history:
+            return cls(history)
+        return cls(history, history.last.object, history.maxKey())
+
+    def _p_resolveConflict(self, old, committed, new):
+        if committed.get('key') > new.get('key'):
+            return committed
+        return new
+
+
+class Index(Object):
+    """Names by value in the `forward` BTree and values by name in the
+    `reverse` BTree. Objects with a tuple value are indexed under each of
+    its items.
+
+    Indexing a name with the values it already has writes nothing, but
+    concurrently indexing different values for the same name changes the
+    same `reverse` entry, which the BTree can't merge. The
+    :exc:`~ZODB.POSException.ConflictError` is left to be retried, as the
+    :class:`~ramverk.transaction.ConflictRetryMixin` does, since resolving
+    it in favour of either would leave `forward` out of step."""
+
+    def configure(self):
+        self.forward = OOBTree()
+        self.reverse = OOBTree()
+
+    def index(self, name, value):
+        if value is None:
+            values = ()
+        elif isinstance(value, (tuple, list)):
+            values = tuple(unicode(item) for item in value)
+        else:
+            values = (unicode(value),)
+        old = self.reverse.get(name, ())
+        if old == values:
+            return
+        for value in set(old) - set(values):
+            names = self.forward[value]
+            names.remove(name)
+            if not names:
+                del self.forward[value]
+        for value in set(values) - set(old):
+            if value not in self.forward:
+                self.forward[value] = OOTreeSet()
+            self.forward[value].insert(name)
+        if values:
+            self.reverse[name] = values
+        elif name in self.reverse:
+            del self.reverse[name]
+
+    def __getitem__(self, value):
+        """The names indexed under `value` as a sorted set."""
+        return self.forward[value]
+
+    def get(self, value):
+        return list(self.forward.get(value, ()))
+
+    def keys(self):
+        """The indexed values."""
+        return self.forward.keys()
+
+    def values_of(self, name):
+        return self.reverse.get(name, ())
+
+
+_word_patterns = {
+    'jbo': re.compile(r"[\w']+", re.UNICODE),
+}
+
+_default_word_pattern = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text, locale):
+    """The lowercased words in `text`, keeping apostrophes in Lojban."""
+    pattern = _word_patterns.get(locale, _default_word_pattern)
+    return pattern.findall(text.lower())
+
+
+@args('locale', 'attributes')
+class TextIndex(Index):
+    """Inverted :class:`Index` of the words in the text `attributes` of
+    objects, tokenized for `locale`."""
+
+    def index_object(self, name, object):
+        terms = set()
+        for attribute in self.attributes:
+            text = getattr(object, attribute, None)
+            if text:
+                terms.update(tokenize(text, self.locale))
+        self.index(name, tuple(terms))
+
+    def search(self, query):
+        """The sorted set of names of objects with every word in
+        `query`, intersecting the postings from the shortest up."""
+        postings = []
+        for term in set(tokenize(query, self.locale)):
+            names = self.forward.get(term)
+            if names is None:
+                return OOTreeSet()
+            postings.append(names)
+        if not postings:
+            return OOTreeSet()
+        postings.sort(key=len)
+        result = postings[0]
+        for names in postings[1:]:
+            result = intersection(result, names)
+            if not result:
+                break
+        return result
+
+
+@args('attributes', 'text')
+class Catalog(Object):
+    """An :class:`Index` for each of the `attributes` of objects, and
+    optionally a :class:`TextIndex` as `text`."""
+
+    text = None
+
+    def configure(self):
+        self.indexes = dict((attribute, Index())
+                            for attribute in self.attributes or ())
+
+    def __getitem__(self, attribute):
+        return self.indexes[attribute]
+
+    def index(self, name, object):
+        for attribute, index in self.indexes.iteritems():
+            index.index(name, getattr(object, attribute, None))
+        if self.text is not None:
+            self.text.index_object(name, object)
+
+
+def word_catalog():
+    return Catalog(('type', 'class_', 'affixes'))
+
+
+def translation_catalog(locale):
+    return Catalog((), TextIndex(locale, ('definition', 'notes')))
+
+
+@args('catalog')
+class VersionedObjects(Object):
+    """:class:`Versions` by name in the `histories` BTree, with the number
+    of names maintained in a :class:`~BTrees.Length.Length` so that
+    counting and paginating don't walk the tree. The latest version of
+    each object is indexed in the `catalog`, if any."""
+
+    catalog = None
+
+    def configure(self):
+        self.histories = OOBTree()
+        self.count = Length()
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            return super(VersionedObjects, self).__setstate__(state)
+        # Legacy state from when this class was itself an OOBTree; the
+        # tree is stored on its own by migrate() or the next save(), which
+        # leaves converting the other histories to migrate().
+        histories = OOBTree()
+        if state is not None:
+            histories.__setstate__(state)
+        super(VersionedObjects, self).__setstate__(
+            dict(histories=histories, count=None))
+
+    def __len__(self):
+        if self.count is None:
+            return len(self.histories)
+        return self.count()
+
+    def __contains__(self, name):
+        return name in self.histories
+
+    def __getitem__(self, name):
+        return self.histories[name]
+
+    def __iter__(self):
+        return iter(self.histories)
+
+    def get(self, name, default=None):
+        return self.histories.get(name, default)
+
+    def keys(self, *args, **kwargs):
+        return self.histories.keys(*args, **kwargs)
+
+    def values(self, *args, **kwargs):
+        return self.histories.values(*args, **kwargs)
+
+    def items(self, *args, **kwargs):
+        return self.histories.items(*args, **kwargs)
 
     def save(self, name, object, *args, **kwargs):
-        if name not in self:
-            self[name] = List()
+        if self.count is None:
+            self.count = Length(len(self.histories))
+        versions = self.histories.get(name)
+        if not isinstance(versions, Versions):
+            if versions is None:
+                self.count.change(1)
+            versions = self.histories[name] = Versions.from_history(versions)
         version = Version(object, *args, **kwargs)
-        self[name].save(version)
+        versions.save(version)
+        if self.catalog is not None:
+            self.catalog.index(name, object)
         return version
 
     def latest(self, name):
-        return self[name].last.object
+        return self.histories[name].latest
+
+    def reindex(self, catalog):
+        """Index the latest objects in a new `catalog` and keep it up to
+        date from now on."""
+        for name, versions in self.histories.iteritems():
+            catalog.index(name, versions.latest)
+        self.catalog = catalog
+
+    def pages(self, per):
+        """The number of pages with `per` names each."""
+        return (len(self) + per - 1) // per
+
+    def page(self, number, per):
+        """The `(name, versions)` items on page `number`, counting from
+        one. Where each page starts is looked up once per connection and
+        number of names, so later pages cost no more than the first."""
+        starts = getattr(self, '_v_page_starts', None)
+        if starts is None or starts[:2] != (len(self), per):
+            keys = list(self.histories.keys())[::per]
+            starts = self._v_page_starts = (len(self), per, keys)
+        if not 1 <= number <= len(starts[2]):
+            return []
+        return list(islice(self.histories.items(min=starts[2][number - 1]),
+                           per))
+
+    def page_after(self, name, per):
+        """The `per` items after `name`, or from the start if `name` is
+        :const:`None`."""
+        if name is None:
+            return list(islice(self.histories.items(), per))
+        return list(islice(self.histories.items(min=name, excludemin=True),
+                           per))
+
+    def migrate(self):
+        """Store legacy state in the current format and wrap legacy
+        histories in :class:`Versions`, returning the number of names
+        converted."""
+        if self.count is None:
+            self.count = Length(len(self.histories))
+        migrated = 0
+        for name, versions in list(self.histories.iteritems()):
+            if not isinstance(versions, Versions):
+                self.histories[name] = Versions.from_history(versions)
+                migrated += 1
+        return migrated
 
 
 @args('of', 'definition', 'notes')
@@ -81,10 +390,12 @@ class Page(Object):
 @has(words=VersionedObjects)
 class Language(Object):
 
-    pass
+    def configure(self):
+        self.words.catalog = translation_catalog(self.locale)
 
 
-@has(words=VersionedObjects, pages=VersionedObjects)
+@has(words=lambda: VersionedObjects(catalog=word_catalog()),
+     pages=VersionedObjects)
 class Properties(Object):
 
     pass
@@ -3,7 +3,7 @@ from setuptools import setup, find_packages
 
 setup(
     name='Ramverk',
-    packages=find_packages(exclude=('deployments', 'tests')),
+    packages=find_packages(exclude=('benchmarks', 'deployments', 'tests')),
 
     install_requires=[
         'Babel',
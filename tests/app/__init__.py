@@ -24,6 +24,10 @@ class TestTemplateContext(TemplateContext):
 
     injected = 42
 
+    @property
+    def unused(self):
+        raise AssertionError('template context resolved an unused name')
+
 
 class TestApp(Application):
 
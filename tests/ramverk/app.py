@@ -1,8 +1,12 @@
-from datetime      import datetime
-from attest        import Tests, assert_hook, raises
-from werkzeug.test import create_environ
-from ramverk.local import get_current, current
-from tests         import testapp, testenv
+from datetime          import datetime
+from attest            import Tests, assert_hook, raises
+from logbook           import Handler
+from werkzeug.test     import Client, create_environ
+from ZODB.DemoStorage  import DemoStorage
+from ZODB.POSException import ConflictError
+from ramverk.local     import get_current, current
+from tests             import testapp, testenv
+from tests.app         import TestApp, TestEnvironment
 
 
 app = Tests(contexts=[testapp])
@@ -49,6 +53,31 @@ def transactions(app):
         assert 3 not in env.persistent
 
 
+@app.test
+def read_only_transactions(app):
+
+    with app.contextbound(create_environ(method='POST')) as env:
+        assert not env.read_only
+        env.persistent[1] = 42
+
+    del app.log_handler.records[:]
+    commits = app.transaction_commits.value
+    with app.contextbound(create_environ()) as env:
+        assert env.read_only
+        assert env.persistent[1] == 42
+    assert app.transaction_commits.value == commits
+    assert not [record for record in app.log_handler.records
+                if record.level_name == 'WARNING']
+
+    with app.contextbound(create_environ()) as env:
+        env.persistent[2] = 43
+    assert app.transaction_commits.value == commits + 1
+    assert app.log_handler.formatted_records[-2]\
+        == '[WARNING] TestApp: read-only GET request to / wrote to the database'
+    with app.contextbound(create_environ()) as env:
+        assert env.persistent[2] == 43
+
+
 @env.test
 def url_building(app, env):
     assert env.path(':index') == '/'
@@ -68,3 +97,47 @@ def json_renderer(app, env):
 
     with raises(TypeError):
         env.render('json', response=response)
+
+
+class ConflictingDataManager(object):
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        self.transaction_manager = None
+
+    def sortKey(self):
+        return 'conflicting'
+
+    def tpc_vote(self, transaction):
+        if self.conflicts:
+            self.conflicts.pop()
+            raise ConflictError
+
+    def abort(self, transaction):
+        pass
+
+    tpc_begin = commit = tpc_finish = tpc_abort = abort
+
+
+@app.test
+def conflicting_commit_retried(app):
+    conflicts = [None, None]
+
+    class Environment(TestEnvironment):
+
+        def __call__(self):
+            self.transaction.join(ConflictingDataManager(conflicts))
+            return self.application.response('committed')
+
+    class App(TestApp):
+        module = TestApp.__module__
+        environment = Environment
+
+    app = App(storage=DemoStorage, secret_key='testing', conflict_backoff=0)
+    depth = len(list(Handler.stack_manager.iter_context_objects()))
+    response = Client(app, app.response).post('/')
+    assert response.data == 'committed'
+    assert app.conflict_retries.value == 2
+    assert app.transaction_conflicts.value == 2
+    after = len(list(Handler.stack_manager.iter_context_objects()))
+    assert after == depth
@@ -1,9 +1,19 @@
-from textwrap import dedent
-from attest   import Tests, assert_hook
-from tests    import testenv
+from __future__       import absolute_import
+from os               import listdir, path
+from shutil           import rmtree
+from tempfile         import mkdtemp
+from textwrap         import dedent
+from attest           import Tests, assert_hook
+from genshi.filters   import Transformer
+from werkzeug.test    import create_environ
+from ZODB.DemoStorage import DemoStorage
+from ramverk.genshi   import CompactTemplate, HTMLTemplate
+from tests            import testenv
+from tests.app        import TestApp
 
 
 genshi = Tests(contexts=[testenv])
+caching = Tests()
 
 
 @genshi.test
@@ -41,6 +51,36 @@ def override_context(app, env):
         </html>""")
 
 
+class UpdatedContextApp(TestApp):
+
+    module = TestApp.__module__
+
+    def update_template_context(self, environment, context):
+        super(UpdatedContextApp, self)\
+            .update_template_context(environment, context)
+        context['injected'] = 'updated'
+
+
+@genshi.test
+def updated_context(app, env):
+    app = UpdatedContextApp(storage=DemoStorage, secret_key='testing')
+    with app.contextbound(create_environ()) as env:
+        response = env.render('context.html')
+    assert 'question is updated' in response.data
+
+
+@genshi.test
+def lazy_context(app, env):
+    context = app.lazy_template_context(env)
+    assert 'injected' in context and 'unused' in context
+    assert 'environment' in context and '_private' not in context
+    assert context['injected'] == 42
+    assert context['environment'] is env
+    assert 'unused' not in context.values
+    context['unused'] = 'shadowed'
+    assert context['unused'] == 'shadowed'
+
+
 @genshi.test
 def stream_filtering(app, env):
     response = env.render('filtering.html')
@@ -86,3 +126,58 @@ def compact_template(app, env):
             <p>Hello, World</p><p>Hello, Friend</p>
           </body>
         </html>""")
+
+
+
+class FilteredHTMLTemplate(HTMLTemplate):
+
+    def filter_html_stream(self, stream):
+        stream = super(FilteredHTMLTemplate, self).filter_html_stream(stream)
+        return stream | Transformer('//p').attr('class', 'filtered')
+
+
+@genshi.test
+def filter_html_stream(app, env):
+    template = FilteredHTMLTemplate('<html><p>Hi</p></html>')
+    assert template.generate().render('html') \
+        == '<html><p class="filtered">Hi</p></html>'
+
+
+@caching.test
+def expansion_cache():
+    parent = mkdtemp()
+    directory = path.join(parent, 'templates')
+    try:
+        app = TestApp(storage=DemoStorage, secret_key='testing',
+                      template_cache=directory)
+        with app.contextbound(create_environ()) as env:
+            env.render('compact.xml', names=['World'])
+        assert len(listdir(directory)) == 1
+
+        filepath = app.genshi_loader.search_path[0] + '/compact.xml'
+        markup = app.expansion_cache.get(CompactTemplate, filepath)
+        assert markup.startswith('<html')
+
+        app.expansion_cache.set(CompactTemplate, filepath,
+                                '<html><p>cached</p></html>')
+        template = CompactTemplate(open(filepath), filepath=filepath,
+                                   loader=app.genshi_loader)
+        assert template.generate().render() == '<html><p>cached</p></html>'
+    finally:
+        rmtree(parent)
+
+
+@caching.test
+def warm_templates():
+    directory = mkdtemp()
+    try:
+        app = TestApp(storage=DemoStorage, secret_key='testing',
+                      template_cache=directory, warm_templates=2)
+        assert len(listdir(directory)) == 5
+        timings = dict(app.warm_genshi_templates())
+        assert sorted(timings) == ['compact.xml', 'context.html',
+                                   'filtering.html', 'html-template.html',
+                                   'index.html', 'newtext.txt']
+        assert all(seconds >= 0 for seconds in timings.itervalues())
+    finally:
+        rmtree(directory)
@@ -1,17 +1,25 @@
 from __future__          import absolute_import
+from os                  import _exit, fork, pipe, read, waitpid, write
+from StringIO            import StringIO
+from threading           import Event
 from attest              import Tests, assert_hook, raises
 from fudge               import Fake
-from werkzeug.test       import create_environ
+from logbook             import Logger, StreamHandler, TestHandler
+from werkzeug.test       import Client, create_environ
+from ZODB.POSException   import ConflictError
 from werkzeug.wrappers   import BaseResponse
 from ramverk.application import BaseApplication
 from ramverk.environment import BaseEnvironment
 from ramverk.local       import UnboundContextError, get_current, current
+from ramverk.logbook     import BatchingHandler
 from ramverk.rendering   import JSONMixin
-from ramverk.transaction import TransactionMixin
+from ramverk.routing     import URLMapMixin
+from ramverk.transaction import ConflictRetryMixin, TransactionMixin
 from ramverk.utils       import super as _super
 from ramverk.utils       import Bunch
 from ramverk.utils       import EagerCachedProperties, ReprAttributes, has
-from ramverk.utils       import InitFromArgs, args
+from ramverk.utils       import Counter, InitFromArgs, LRUCache, args
+from ramverk.utils       import increment_counter
 from ramverk.wrappers    import DeferredResponseInitMixin
 from tests               import mocking
 
@@ -112,6 +120,97 @@ def doomed_transaction():
         pass
 
 
+@mock.test
+def conflicting_transaction():
+
+    exited = []
+
+    class Base(BaseEnvironment):
+        def __exit__(self, *exc_info):
+            exited.append(exc_info[0])
+
+    class Env(TransactionMixin, Base):
+        transaction_manager =\
+            (Fake('TransactionManager')
+            .remember_order()
+            .expects('begin')
+            .expects('isDoomed')
+            .returns(False)
+            .expects('commit')
+            .raises(ConflictError())
+            .expects('abort'))
+
+    with raises(ConflictError):
+        with Env(BaseApplication(), create_environ()):
+            pass
+    assert exited == [ConflictError]
+
+
+@mock.test
+def read_only_transaction():
+
+    class Env(TransactionMixin, BaseEnvironment):
+        transaction_manager =\
+            (Fake('TransactionManager')
+            .remember_order()
+            .expects('isDoomed')
+            .returns(False)
+            .expects('get')
+            .returns(Fake('Transaction').has_attr(_resources=[]))
+            .expects('abort'))
+
+    env = Env(BaseApplication(read_only_methods=('GET',)), create_environ())
+    assert env.read_only
+    with env:
+        pass
+
+
+@unit.test
+def conflict_retry():
+
+    attempts = []
+
+    class Env(BaseEnvironment):
+
+        def __call__(self):
+            attempts.append(self.request.stream.read())
+            if len(attempts) < 3:
+                raise ConflictError
+            return self.application.response(attempts[-1])
+
+    class App(ConflictRetryMixin, BaseApplication):
+        environment = Env
+
+    app = App(conflict_backoff=0)
+    response = Client(app, BaseResponse).post('/', data='payload')
+    assert response.data == 'payload'
+    assert attempts == ['payload'] * 3
+    assert app.conflict_retries.value == 2
+    assert app.conflict_failures.value == 0
+
+    del attempts[:]
+    app = App(conflict_backoff=0, conflict_attempts=2)
+    with raises(ConflictError):
+        Client(app, BaseResponse).get('/')
+    assert len(attempts) == 2
+    assert app.conflict_retries.value == 1
+    assert app.conflict_failures.value == 1
+
+
+@unit.test
+def counter():
+    counter = Counter()
+    assert counter.value == 0
+    for _ in range(3):
+        counter.increment()
+    assert counter.value == 3
+
+    counted = Bunch(hits=counter)
+    increment_counter(counted, 'hits')
+    increment_counter(counted, 'misses')
+    assert counter.value == 4
+
+
 @unit.test
 def deferred_response_init():
 
@@ -217,3 +316,130 @@ def init_from_args():
             self.z = 3
 
     assert vars(CustomInit(1, 2)) == dict(x=1, y=2, z=3)
+
+
+@unit.test
+def cached_endpoint_dispatch():
+
+    class App(URLMapMixin, BaseApplication):
+        pass
+
+    class Endpoints(object):
+        def method(self, answer):
+            return answer
+
+    def function(answer, question):
+        return answer, question
+
+    app = App()
+    endpoint = app.resolve_endpoint('tests.app.module:index')
+    assert endpoint is app.resolve_endpoint('tests.app.module:index')
+    assert app._resolved_endpoints == {'tests.app.module:index': endpoint}
+
+    assert app.endpoint_arguments(function) == ('answer', 'question')
+    assert app.endpoint_arguments(Endpoints().method) == ('answer',)
+    assert app.endpoint_arguments(Endpoints().method) == ('answer',)
+    assert len(app._endpoint_signatures) == 2
+
+    env = Bunch(answer=42, question='ultimate')
+    assert app.dispatch_to_endpoint(env, function) == (42, 'ultimate')
+    assert app.dispatch_to_endpoint(env, function, answer=144)\
+        == (144, 'ultimate')
+    assert app.dispatch_to_endpoint(env, Endpoints().method) == 42
+
+
+@unit.test
+def lru_cache():
+
+    cache = LRUCache(10, sizeof=len)
+    cache['a'] = 'aaaa'
+    cache['b'] = 'bbbb'
+    assert cache.size == 8 and len(cache) == 2
+
+    assert cache['a'] == 'aaaa'
+    cache['c'] = 'cccc'
+    assert 'b' not in cache
+    assert 'a' in cache and 'c' in cache
+    assert cache.size == 8
+
+    cache['d'] = 'd' * 11
+    assert 'd' not in cache and cache.size == 8
+
+    cache['a'] = 'a'
+    assert cache.size == 5
+
+    del cache['a']
+    assert cache.get('a') is None and cache.size == 4
+
+    with raises(KeyError):
+        cache['b']
+
+    cache.clear()
+    assert not len(cache) and cache.size == 0
+
+    counted = LRUCache(1)
+    counted['a'] = 'a'
+    counted.get('a'), counted.get('b')
+    hits, misses = counted.hits.value, counted.misses.value
+    assert hits == 1 and misses == 1
+
+
+@unit.test
+def batching_log_handler():
+    stream = StringIO()
+    handler = BatchingHandler(StreamHandler(stream, level='INFO',
+                              format_string='{record.message}'),
+                              level='DEBUG')
+    with handler.threadbound():
+        Logger('test').info('one')
+        Logger('test').debug('debug')
+        Logger('test').info('two')
+    handler.close()
+    assert stream.getvalue() == 'one\ntwo\n'
+
+
+@unit.test
+def batching_log_handler_after_fork():
+    reader, writer = pipe()
+
+    class PipeHandler(TestHandler):
+        def emit(self, record):
+            write(writer, record.message + '\n')
+
+    handler = BatchingHandler(PipeHandler())
+    with handler.threadbound():
+        Logger('test').warn('parent')
+        pid = fork()
+        if not pid:
+            try:
+                Logger('test').warn('child')
+                handler.close()
+            finally:
+                _exit(0)
+    waitpid(pid, 0)
+    handler.close()
+    written = sorted(read(reader, 100).splitlines())
+    assert written == ['child', 'parent']
+
+
+@unit.test
+def dropping_log_records():
+    writing, release = Event(), Event()
+
+    class SlowHandler(TestHandler):
+        def emit(self, record):
+            writing.set()
+            release.wait()
+            TestHandler.emit(self, record)
+
+    slow = SlowHandler(format_string='{record.message}')
+    handler = BatchingHandler(slow, maxsize=1, batch_size=1)
+    with handler.threadbound():
+        Logger('test').warn('written')
+        writing.wait()
+        Logger('test').warn('queued')
+        Logger('test').warn('dropped')
+    release.set()
+    handler.close()
+    assert slow.formatted_records == ['written', 'queued']
+    assert handler.dropped.value == 1
@@ -1,9 +1,29 @@
-from textwrap import dedent
-from attest   import Tests, assert_hook
-from tests    import wsgiclient
+from gzip                import GzipFile
+from os                  import listdir, path, stat
+from StringIO            import StringIO
+from shutil              import rmtree
+from tempfile            import mkdtemp
+from textwrap            import dedent
+from threading           import Thread
+from time                import sleep
+from attest              import Tests, assert_hook
+from logbook             import Logger, TestHandler
+from werkzeug.exceptions import NotFound
+from werkzeug.test       import Client, create_environ
+from werkzeug.wrappers   import BaseResponse
+from ZODB.DemoStorage    import DemoStorage
+from ramverk.metrics     import MetricsMixin
+from ramverk.session     import SessionStore, SessionStoreMixin
+from ramverk.wsgi        import SharedFiles
+from tests               import wsgiclient
+from tests.app           import TestApp
+
+import scss
 
 
 wsgi = Tests(contexts=[wsgiclient])
+sessions = Tests()
+metrics = Tests()
 
 
 @wsgi.test
@@ -12,6 +32,7 @@ def first_get_to_index(client):
     assert client.application.log_handler.formatted_records\
         == ['[DEBUG] TestApp: connecting ZODB',
              '[INFO] TestApp: in index view',
+          '[WARNING] TestApp: read-only GET request to / wrote to the database',
             '[DEBUG] TestApp: disconnecting ZODB']
     assert response.status_code == 200
     assert response.data == dedent("""\
@@ -93,8 +114,316 @@ def compiled_scss(client):
         """)
 
 
+@wsgi.test
+def compiled_scss_conditional(client):
+    response = client.get('/compiled/style.css')
+    etag = response.headers['ETag']
+    assert etag
+
+    response = client.get('/compiled/style.css',
+                          headers=[('If-None-Match', etag)])
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag and not response.data
+
+    response = client.get('/compiled/style.css',
+                          headers=[('If-None-Match', '"stale"')])
+    assert response.status_code == 200
+
+    assert client.get('/compiled/missing.css').status_code == 404
+
+
+@wsgi.test
+def compiled_scss_cache(client):
+    parent = mkdtemp()
+    directory = path.join(parent, 'compiled')
+    client.application.settings.compiled_cache = directory
+    try:
+        response = client.get('/compiled/style.css')
+        assert response.status_code == 200
+        assert response.data.startswith('body h1')
+        cached = [path.join(directory, name) for name in listdir(directory)]
+        assert len(cached) == 1
+        assert open(cached[0]).read() == response.data
+    finally:
+        rmtree(parent)
+
+
+@wsgi.test
+def concurrent_scss_compiles(client):
+    compiles, compile = [], scss.Scss.compile
+
+    def slow_compile(self, *args, **kwargs):
+        compiles.append(scss.LOAD_PATHS)
+        sleep(0.05)
+        return compile(self, *args, **kwargs)
+
+    responses = []
+
+    def request():
+        other = Client(client.application, client.response_wrapper)
+        responses.append(other.get('/compiled/style.css').data)
+
+    scss.Scss.compile = slow_compile
+    try:
+        threads = [Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        scss.Scss.compile = compile
+
+    assert len(compiles) == 1
+    assert compiles[0].split(',')[0].endswith('/compiled')
+    assert len(responses) == 8 and len(set(responses)) == 1
+    assert responses[0].startswith('body h1')
+
+
+@wsgi.test
+def built_compiled_assets(client):
+    app, static = client.application, mkdtemp()
+    app.shared_data = {'/static': static}
+    app.compiled_directory = path.join(static, 'compiled')
+    try:
+        manifest = app.build_compiled()
+        assert manifest.keys() == ['style.css']
+        hashed = manifest['style.css']
+        assert hashed.startswith('compiled/style.')
+        assert hashed.endswith('.css') and hashed != 'compiled/style.css'
+        assert app.compiled_manifest == manifest
+
+        with app.contextbound(create_environ()) as env:
+            assert env.path('compiled', name='style.css') \
+                == '/static/' + hashed
+            assert env.path('compiled', name='other.css') \
+                == '/compiled/other.css'
+
+        response = client.get('/static/' + hashed)
+        assert response.status_code == 200
+        assert response.data == client.get('/compiled/style.css').data
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000'
+
+        filename = path.join(static, hashed)
+        assert stat(filename).st_mode & 0777 == 0644
+        stale = path.join(app.compiled_directory, 'style.0123456789ab.css')
+        open(stale, 'w').close()
+        assert app.build_compiled() == manifest
+        assert not path.exists(stale) and path.exists(filename)
+    finally:
+        rmtree(static)
+
+
+@wsgi.test
+def static_files(client):
+    response = client.get('/static/hello.txt')
+    assert response.status_code == 200
+    assert response.data == 'Hello, static world!\n'
+    assert response.mimetype == 'text/plain'
+    assert response.headers['Cache-Control'] == 'public, max-age=43200'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert 'Content-Encoding' not in response.headers
+
+    etag = response.headers['ETag']
+    response = client.get('/static/hello.txt',
+                          headers=[('If-None-Match', etag)])
+    assert response.status_code == 304 and not response.data
+
+    response = client.get('/static/hello.txt',
+                          headers=[('Accept-Encoding', 'gzip, deflate')])
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] != etag
+    assert GzipFile(fileobj=StringIO(response.data)).read() \
+        == 'Hello, static world!\n'
+
+    assert client.head('/static/hello.txt').data == ''
+    assert client.get('/static/missing.txt').status_code == 404
+    assert client.get('/static/../__init__.py').status_code == 404
+    assert client.get('/static/%2E%2E/__init__.py').status_code == 404
+
+
+@wsgi.test
+def streamed_static_files(client):
+    directory = path.join(path.dirname(__file__), '..', 'app', 'static')
+    shared = SharedFiles(NotFound(), {'/files': directory}, max_file_size=8)
+    client = Client(shared, BaseResponse)
+    response = client.get('/files/hello.txt')
+    assert response.data == 'Hello, static world!\n'
+    assert response.headers['Content-Length'] == '21'
+    entry = shared.cache.get(path.join(directory, 'hello.txt'))
+    assert entry.data is None and entry.gzipped.data is None
+
+
+@wsgi.test
+def cached_static_file_size(client):
+    directory = path.join(path.dirname(__file__), '..', 'app', 'static')
+    shared = SharedFiles(NotFound(), {'/files': directory})
+    Client(shared, BaseResponse).get('/files/hello.txt')
+    entry = shared.cache.get(path.join(directory, 'hello.txt'))
+    size = len(entry.data) + len(entry.gzipped.data) + 2
+    assert shared.cache.size == size
+
+
 @wsgi.test
 def session(client):
     response = client.post('/session/', data={'user': 'admin'},
                                         follow_redirects=True)
     assert response.data == 'admin'
+
+
+@wsgi.test
+def untouched_session(client):
+    client.post('/session/', data={'user': 'admin'})
+    application = client.application
+    assert application.sessions_loaded.value == 1
+    assert application.sessions_saved.value == 1
+
+    response = client.get('/session/')
+    assert 'Set-Cookie' not in response.headers
+    assert application.sessions_loaded.value == 2
+    assert application.sessions_saved.value == 1
+
+    response = client.get('/classic/')
+    assert 'Set-Cookie' not in response.headers
+    assert application.sessions_loaded.value == 2
+
+
+
+@wsgi.test
+def server_timing(client):
+    response = client.get('/')
+    assert 'Server-Timing' not in response.headers
+
+    client.application.settings.update(timing=True, server_timing=True)
+    client.get('/')
+    response = client.get('/')
+    phases = [timing.split(';')[0] for timing
+              in response.headers['Server-Timing'].split(', ')]
+    assert phases == ['route', 'zodb-open', 'template', 'generate',
+                      'serialize', 'dispatch', 'total']
+
+    histograms = client.application.timing_histograms
+    total = histograms['tests.app.frontend:index', 'total']
+    assert total.count == 2 and total.sum > 0
+    assert total.cumulative()[-1] == (float('inf'), 2)
+
+
+class ServerSessionApp(SessionStoreMixin, TestApp):
+    pass
+
+
+@sessions.test
+def server_side_sessions():
+    app = ServerSessionApp(storage=DemoStorage, secret_key='testing',
+                           session_flush_interval=60)
+    client = Client(app, app.response)
+    response = client.post('/session/', data={'user': 'admin'})
+    assert 'admin' not in response.headers['Set-Cookie']
+    sid = response.headers['Set-Cookie'].split('=', 1)[1].split('.')[0]
+    assert client.get('/session/').data == 'admin'
+
+    client.post('/session/', data={'user': 'guest'})
+    response = client.get('/session/')
+    assert response.data == 'guest'
+    assert 'Set-Cookie' not in response.headers
+
+    app.session_store.close()
+    store = SessionStore(app._zodb_connection_pool)
+    assert store.get(sid) == {'user': 'guest'}
+    assert store.get(sid[::-1]).new
+
+    environ = create_environ(headers={'Cookie': 'session={0}.forged'
+                                                .format(sid)})
+    assert store.load_cookie(app.request(environ), 'testing').new
+
+    store.max_age = store.sweep_interval = -1
+    store.flush()
+    assert SessionStore(app._zodb_connection_pool).get(sid).new
+
+
+@sessions.test
+def sessions_saved_by_other_processes():
+    app = ServerSessionApp(storage=DemoStorage, secret_key='testing')
+    first = SessionStore(app._zodb_connection_pool, flush_interval=60)
+    second = SessionStore(app._zodb_connection_pool, flush_interval=60)
+
+    session = first.new()
+    session['draft'] = 'coi'
+    first.save(session)
+    first.flush()
+    assert second.get(session.sid) == {'draft': 'coi'}
+
+    session = first.get(session.sid)
+    session['draft'] = "co'o"
+    first.save(session)
+    assert second.get(session.sid) == {'draft': 'coi'}
+    first.close()
+    assert second.get(session.sid) == {'draft': "co'o"}
+    second.close()
+
+
+class BrokenDB(object):
+
+    def open(self, *args, **kwargs):
+        raise IOError('storage unavailable')
+
+
+@sessions.test
+def failed_session_flushes():
+    app = ServerSessionApp(storage=DemoStorage, secret_key='testing')
+    db, handler = app._zodb_connection_pool, TestHandler()
+    store = SessionStore(BrokenDB(), flush_interval=0.01, log=Logger('test'))
+    session = store.new()
+    session['user'] = 'admin'
+    with handler.applicationbound():
+        store.save(session)
+        while not handler.records:
+            sleep(0.01)
+    assert handler.formatted_records[0]\
+        .startswith('[ERROR] test: failed to flush sessions')
+
+    session['user'] = 'guest'
+    store.save(session)
+    store.db = db
+    store.close()
+    assert SessionStore(db).get(session.sid) == {'user': 'guest'}
+
+
+class MetricsApp(MetricsMixin, TestApp):
+
+    module = TestApp.__module__
+
+
+@metrics.test
+def metrics_endpoint():
+    app = MetricsApp(storage=DemoStorage, secret_key='testing')
+    client = Client(app, app.response)
+    client.get('/')
+    client.get('/')
+    client.get('/static/hello.txt')
+    client.get('/static/hello.txt')
+    client.post('/session/', data={'user': 'admin'})
+
+    response = client.get('/metrics',
+                          environ_base={'REMOTE_ADDR': '192.0.2.1'})
+    assert response.status_code == 404
+    response = client.get('/metrics',
+                          environ_base={'REMOTE_ADDR': '127.0.0.1'},
+                          headers=[('X-Forwarded-For', '192.0.2.1')])
+    assert response.status_code == 404
+
+    response = client.get('/metrics',
+                          environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    assert response.mimetype == 'text/plain'
+    lines = response.data.splitlines()
+    assert '# TYPE ramverk_requests_total counter' in lines
+    assert 'ramverk_requests_total{endpoint="tests.app.frontend:index"} 2'\
+        in lines
+    assert 'ramverk_request_phase_seconds_bucket{endpoint='\
+           '"tests.app.frontend:index",le="+Inf",phase="total"} 2' in lines
+    assert 'ramverk_transactions_total{outcome="commit"} 2' in lines
+    assert 'ramverk_zodb_connections{state="available"} 1' in lines
+    assert 'ramverk_zodb_stores_total 2' in lines
+    assert 'ramverk_template_lookups_total 2' in lines
+    assert 'ramverk_template_compiles_total 1' in lines
+    assert 'ramverk_cache_hits_total{cache="static"} 1' in lines
+    assert 'ramverk_cache_misses_total{cache="static"} 1' in lines
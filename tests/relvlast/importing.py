@@ -0,0 +1,70 @@
+from __future__         import absolute_import
+from attest             import Tests, assert_hook, raises
+from transaction        import TransactionManager
+from ZODB.DB            import DB
+from ZODB.DemoStorage   import DemoStorage
+from ramverk.utils      import Bunch
+from relvlast.importing import import_order, save_word, save_words
+from relvlast.objects   import Language, Root
+
+
+importing = Tests()
+
+
+def record(class_, definition=u'particle'):
+    return Bunch(id=u'ui', type=u'cmavo', class_=class_, affixes=(),
+                 definition=definition, notes=None)
+
+
+@importing.test
+def authoritative_properties():
+    db = Root()
+    jbo, en = Language('jbo'), Language('en')
+
+    status = save_word(record('UI*1'), db, en, authoritative=False)
+    assert status == 'added'
+    status = save_word(record('UI*'), db, jbo)
+    assert status == 'added'
+    assert db.properties.words.latest('ui').class_ == 'UI*'
+
+    status = save_word(record('UI*1'), db, en, authoritative=False)
+    assert status == 'unchanged'
+    status = save_word(record('UI*'), db, jbo)
+    assert status == 'unchanged'
+    assert len(db.properties.words['ui'].history) == 2
+
+    status = save_word(record('UI3'), db, jbo)
+    assert status == 'changed'
+    assert db.properties.words.latest('ui').class_ == 'UI3'
+
+
+@importing.test
+def resumed_import():
+    db = DB(DemoStorage())
+    manager = TransactionManager()
+    connection = db.open(transaction_manager=manager)
+    root = connection.root()['root'] = Root()
+    words = [Bunch(record(None), id=id) for id in (u'a', u'b', u'c')]
+    words.insert(2, Bunch(id=u'broken'))
+    reports = []
+
+    def report(counts, seconds, last):
+        reports.append((sum(counts.itervalues()), last))
+
+    with raises(AttributeError):
+        save_words(words, root, 'jbo', manager, batch_size=1, report=report)
+    assert reports == [(1, u'a'), (2, u'b'), (2, u'b')]
+    assert sorted(root.translations['jbo'].words.keys()) == [u'a', u'b']
+
+    words.remove(words[2])
+    counts = save_words(words, root, 'jbo', manager, batch_size=2,
+                        start_after=reports[-1][1])
+    assert counts == dict(added=1, changed=0, unchanged=0)
+    assert u'c' in root.translations['jbo'].words
+    connection.close()
+
+
+@importing.test
+def authoritative_export_first():
+    order = import_order(['en', 'eo', 'es', 'jbo'])
+    assert order == ['jbo', 'en', 'eo', 'es']
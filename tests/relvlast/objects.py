@@ -0,0 +1,56 @@
+from attest           import Tests, assert_hook
+from BTrees.OOBTree   import OOBTree
+from relvlast.objects import List, Version, VersionedObjects, VersionList,\
+                             Versions
+
+
+objects = Tests()
+
+
+def legacy_objects(**histories):
+    tree = OOBTree()
+    for name, texts in histories.iteritems():
+        tree[name] = List()
+        for text in texts:
+            tree[name].save(Version(text))
+    legacy = VersionedObjects.__new__(VersionedObjects)
+    legacy.__setstate__(tree.__getstate__())
+    return legacy
+
+
+@objects.test
+def legacy_state():
+    legacy = legacy_objects(klama=['go'], cusku=['say', 'express'])
+    assert legacy.count is None
+    assert len(legacy) == 2
+    assert sorted(legacy.keys()) == ['cusku', 'klama']
+    assert legacy.latest('cusku') == 'express'
+
+    migrated = legacy.migrate()
+    assert migrated == 2
+    count = legacy.count()
+    assert count == 2
+    versions = legacy['cusku']
+    assert isinstance(versions, Versions)
+    assert isinstance(versions.history, VersionList)
+    assert [version.object for version in versions.history.values()]\
+        == ['say', 'express']
+    assert versions.latest == 'express'
+    migrated = legacy.migrate()
+    assert migrated == 0
+
+
+@objects.test
+def save_to_legacy_state():
+    legacy = legacy_objects(klama=['go'], cusku=['say'])
+    legacy.save('cusku', 'express')
+    legacy.save('tavla', 'talk')
+    count = legacy.count()
+    assert count == 3
+    assert isinstance(legacy['cusku'], Versions)
+    assert isinstance(legacy['tavla'], Versions)
+    assert isinstance(legacy['klama'], List)
+    assert legacy.latest('cusku') == 'express'
+    assert legacy.latest('klama') == 'go'
+    migrated = legacy.migrate()
+    assert migrated == 1